@@ -0,0 +1,236 @@
+import asyncio
+import functools
+import logging
+from typing import Dict, Callable
+
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from guirpc.amqp.chunks import is_stream
+from guirpc.amqp.consumer import Consumer, ProxyReconnectConsumer
+from guirpc.amqp.domain import ProxyResponse
+from guirpc.amqp.domain.encoding import BytesEncoder
+from guirpc.amqp.domain.exceptions import InvalidCompressionCodecError
+from guirpc.amqp.domain.objects import ServerOptions
+from guirpc.amqp.workers import ProcessFaaSPool
+
+LOGGER = logging.getLogger("rpcServer")
+
+
+class AsyncConsumer(Consumer):
+    """
+    This is an asyncio sibling of Consumer, every received message
+    is handled as a task on a single event loop.
+
+    Coroutine FaaS (async def) are awaited on the event loop, so up to
+    'concurrency' requests are processed at the same time.
+    Plain FaaS still run on the worker pool, without blocking the loop.
+    """
+
+    CONNECTION_CLASS = AsyncioConnection
+
+    def __init__(
+        self,
+        faas_callables: Dict[str, Callable],
+        *args,
+        concurrency: int = 100,
+        **kwargs,
+    ):
+        super(AsyncConsumer, self).__init__(faas_callables, *args, **kwargs)
+        self._concurrency = concurrency
+        self._loop = None
+        self._slots = None
+        self._worker_slots = None
+
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    def connection_options(self) -> dict:
+        return dict(custom_ioloop=self._loop)
+
+    def run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        # plain FaaS wait here for a free worker instead of
+        # blocking the event loop on the worker pool submit
+        self._worker_slots = asyncio.Semaphore(self.worker_pool.max_workers)
+        try:
+            super(AsyncConsumer, self).run()
+        finally:
+            # a new consumer and loop are created on each reconnection
+            self.close_loop()
+
+    def start_ioloop(self):
+        self._loop.run_forever()
+
+    def close_loop(self):
+        """Cancels the tasks left on the event loop and closes it."""
+        # Python 3.6 has no asyncio.all_tasks
+        all_tasks = getattr(asyncio, "all_tasks", None) or (
+            asyncio.Task.all_tasks
+        )
+        tasks = [task for task in all_tasks(self._loop) if not task.done()]
+        for task in tasks:
+            task.cancel()
+        if tasks:
+            self._loop.run_until_complete(
+                asyncio.gather(*tasks, return_exceptions=True)
+            )
+        self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+        self._loop.close()
+        asyncio.set_event_loop(None)
+
+    def call_threadsafe(self, callback):
+        self._loop.call_soon_threadsafe(callback)
+
+    def call_later(self, delay: float, callback):
+        return self._loop.call_later(delay, callback)
+
+    def cancel_call(self, handle):
+        if handle is not None:
+            handle.cancel()
+
+    def dispatch_message(self, _ch, basic_deliver, properties, body):
+        """Handles message concurrency with asyncio tasks."""
+        self._in_flight += 1
+        task = self._loop.create_task(
+            self.process_message_async(_ch, basic_deliver, properties, body)
+        )
+        task.add_done_callback(
+            functools.partial(
+                self.on_task_done, tag=basic_deliver.delivery_tag
+            )
+        )
+        if is_stream(body):
+            task.add_done_callback(lambda _: body.close())
+
+    def dispatch_batch(self, faas_name, messages):
+        """Runs a batch of messages of a FaaS as an asyncio task."""
+        self._in_flight += 1
+        task = self._loop.create_task(
+            self.process_batch_async(faas_name, messages)
+        )
+        task.add_done_callback(
+            functools.partial(
+                self.on_task_done, tag=messages[0][1].delivery_tag
+            )
+        )
+        task.add_done_callback(lambda _: self.close_bodies(messages))
+
+    async def process_batch_async(self, faas_name, messages):
+        # batch FaaS are plain functions, they run on the worker pool
+        async with self._slots:
+            async with self._worker_slots:
+                await asyncio.wrap_future(
+                    self.worker_pool.submit(
+                        self.process_batch, faas_name, messages
+                    )
+                )
+
+    def on_task_done(self, task, tag):
+        if task.cancelled():
+            LOGGER.warning(f"#{tag} Message processing was cancelled")
+            self.on_processing_done()
+        else:
+            self.on_message_processed(task, tag)
+
+    async def process_message_async(
+        self, _ch, basic_deliver, properties, body
+    ):
+        tag = basic_deliver.delivery_tag
+        async with self._slots:
+            if self.ack_mode == ServerOptions.ACK_EARLY:
+                self.acknowledge_message(tag, _ch)
+                await self.handle_message_async(
+                    _ch, basic_deliver, properties, body
+                )
+            else:
+                try:
+                    await self.handle_message_async(
+                        _ch, basic_deliver, properties, body
+                    )
+                finally:
+                    self.acknowledge_message(tag, _ch)
+
+    async def handle_message_async(self, _ch, basic_deliver, properties, body):
+        faas_name = self.log_received_message(basic_deliver, properties)
+        x_resp = None
+        try:
+            x_resp = await self.call_faas_async(faas_name, body, properties)
+            if isinstance(x_resp, ProxyResponse):
+                self.reply_message(
+                    _ch, basic_deliver, properties, faas_name, x_resp
+                )
+                return
+            # generator FaaS run on the worker pool as they are iterated
+            async with self._worker_slots:
+                await asyncio.wrap_future(
+                    self.worker_pool.submit(
+                        self.reply_stream,
+                        _ch,
+                        basic_deliver,
+                        properties,
+                        faas_name,
+                        x_resp,
+                    )
+                )
+        finally:
+            self.reply_duplicates(faas_name, body, properties, x_resp)
+
+    async def call_faas_async(
+        self, faas_name, body, properties
+    ) -> ProxyResponse:
+        faas = self.faas_callables.get(faas_name)
+        binary_codec = BytesEncoder.codec_of(properties.headers)
+        if faas is None:
+            return self.not_registered_response(faas_name, binary_codec)
+
+        try:
+            if self.runs_in_process(faas):
+                return ProcessFaaSPool.to_response(
+                    await asyncio.wrap_future(
+                        self.process_pool.submit(faas_name, body, properties)
+                    )
+                )
+            if asyncio.iscoroutinefunction(faas):
+                return await faas(body, properties)
+            async with self._worker_slots:
+                return await asyncio.wrap_future(
+                    self.worker_pool.submit(faas, body, properties)
+                )
+        except InvalidCompressionCodecError as err:
+            return self.request_error_response(err, binary_codec)
+        except Exception as err:
+            return self.server_error_response(err, binary_codec)
+
+
+class AsyncProxyReconnectConsumer(ProxyReconnectConsumer):
+    """
+    This is the asyncio proxy consumer,
+    it reconnects the nested AsyncConsumer when necessary.
+    """
+
+    CONSUMER_CLASS = AsyncConsumer
+
+    def __init__(
+        self,
+        faas_callables: Dict[str, Callable],
+        *args,
+        concurrency: int = 100,
+        **kwargs,
+    ):
+        self._concurrency = concurrency
+        super(AsyncProxyReconnectConsumer, self).__init__(
+            faas_callables, *args, **kwargs
+        )
+
+    @property
+    def concurrency(self):
+        return self._concurrency
+
+    def _consumer_options(self) -> dict:
+        return dict(
+            super(AsyncProxyReconnectConsumer, self)._consumer_options(),
+            concurrency=self._concurrency,
+        )
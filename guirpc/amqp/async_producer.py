@@ -0,0 +1,288 @@
+import asyncio
+import logging
+from typing import AsyncIterator, Dict
+from uuid import uuid4
+
+import pika
+from pika.adapters.asyncio_connection import AsyncioConnection
+
+from .chunks import ChunkAssembler
+from .domain.exceptions import ResponseTimeoutError
+from .domain.mixins import AMQPMixin
+from .domain.objects import (
+    AMQPEntities,
+    ClientOptions,
+    ProxyRequest,
+    ProxyResponse,
+)
+from .producer import Producer, ResponseStream
+
+LOGGER = logging.getLogger("rpcClient")
+
+
+class AsyncProducer(AMQPMixin):
+    """
+    This is an asyncio RPC client/producer, it runs its connection
+    on the event loop so publishing a request never blocks it.
+
+    Requests are matched with their responses by correlation id through
+    a single reply queue (or the direct reply-to pseudo-queue),
+    so many concurrent requests share the same connection and channel.
+    """
+
+    # bytes the connection may buffer before the next chunk is published
+    WRITE_BUFFER_LIMIT = 1024 * 1024
+    # seconds between checks of the write buffer while it drains
+    DRAIN_INTERVAL = 0.005
+
+    def __init__(
+        self,
+        amqp_url: str,
+        amqp_entities: AMQPEntities,
+        direct_reply_to: bool = False,
+    ):
+        super().__init__(amqp_entities)
+        self._amqp_url = amqp_url
+        self._direct_reply_to = direct_reply_to
+        self._connection = None
+        self._channel = None
+        self._response_queue = None
+        self._opened = None
+        self._pending: Dict[str, asyncio.Future] = dict()
+        self._streams: Dict[str, asyncio.Queue] = dict()
+
+    @property
+    def amqp_url(self):
+        return self._amqp_url
+
+    @property
+    def direct_reply_to(self):
+        return self._direct_reply_to
+
+    @property
+    def response_queue(self):
+        return self._response_queue
+
+    @property
+    def is_open(self):
+        return bool(
+            self._connection
+            and self._connection.is_open
+            and self._channel
+            and self._channel.is_open
+        )
+
+    @property
+    def in_flight(self):
+        """Number of published requests waiting for a response."""
+        return len(self._pending)
+
+    async def open(self):
+        """Connects to the broker and starts consuming responses."""
+        loop = asyncio.get_event_loop()
+        self._opened = loop.create_future()
+        self._connection = AsyncioConnection(
+            parameters=pika.URLParameters(self.amqp_url),
+            on_open_callback=self.on_connection_open,
+            on_open_error_callback=self.on_connection_open_error,
+            on_close_callback=self.on_connection_closed,
+            custom_ioloop=loop,
+        )
+        await self._opened
+
+    def close(self):
+        if self._connection and not (
+            self._connection.is_closing or self._connection.is_closed
+        ):
+            self._connection.close()
+
+    def on_connection_open(self, _unused_connection):
+        self._connection.channel(on_open_callback=self.on_channel_open)
+
+    def on_connection_open_error(self, _unused_connection, err):
+        LOGGER.error("Connection open failed: %s", err)
+        self._set_opened(err)
+
+    def on_connection_closed(self, _unused_connection, reason):
+        self._channel = None
+        self._set_opened(reason)
+        self._fail_pending(reason)
+
+    def on_channel_open(self, channel):
+        self._channel = channel
+        self._channel.add_on_close_callback(self.on_channel_closed)
+        if self.direct_reply_to:
+            self._response_queue = ClientOptions.DIRECT_REPLY_TO
+            self.start_consuming()
+        else:
+            self._channel.queue_declare(
+                queue=self.amqp_entities.queue,
+                exclusive=True,
+                auto_delete=True,
+                callback=self.on_queue_declareok,
+            )
+
+    def on_channel_closed(self, _channel, reason):
+        LOGGER.warning("Channel was closed: %s", reason)
+        self._fail_pending(reason)
+        self.close()
+
+    def on_queue_declareok(self, frame):
+        self._response_queue = frame.method.queue
+        self.start_consuming()
+
+    def start_consuming(self):
+        self._channel.basic_consume(
+            queue=self._response_queue,
+            on_message_callback=self.on_response,
+            auto_ack=True,
+            callback=self.on_consumeok,
+        )
+
+    def on_consumeok(self, _frame):
+        self._set_opened()
+
+    def on_response(self, _ch, _method, props, body):
+        parts = self._streams.get(props.correlation_id)
+        if parts is not None:
+            parts.put_nowait((body, props))
+            return
+        future = self._pending.pop(props.correlation_id, None)
+        if future is None or future.done():
+            # response of a request that timed out or was cancelled
+            return
+
+        try:
+            future.set_result(Producer.to_x_response(body, props))
+        except Exception as err:
+            future.set_exception(err)
+
+    async def publish(
+        self, request: ProxyRequest, timeout: float = None
+    ) -> ProxyResponse:
+        """
+        Publishes the request and waits for its response.
+
+        :param request: the request to publish.
+        :param timeout: seconds to wait for the response,
+            it waits forever if None.
+        :raises ResponseTimeoutError: if the timeout expires.
+        """
+        corr_id = str(uuid4())
+        future = asyncio.get_event_loop().create_future()
+        self._pending[corr_id] = future
+        try:
+            await self._send(request, corr_id)
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            raise ResponseTimeoutError(corr_id, timeout)
+        finally:
+            self._pending.pop(corr_id, None)
+
+    async def publish_stream(
+        self, request: ProxyRequest, timeout: float = None
+    ) -> AsyncIterator[ProxyResponse]:
+        """
+        Publishes the request of a generator FaaS and yields
+        its partial results as they are received.
+
+        :param timeout: seconds to wait for each partial result,
+            it waits forever if None.
+        :raises ResponseTimeoutError: if the timeout expires.
+        """
+        corr_id = str(uuid4())
+        parts = asyncio.Queue()
+        self._streams[corr_id] = parts
+        try:
+            await self._send(request, corr_id)
+            while True:
+                try:
+                    body, props = await asyncio.wait_for(parts.get(), timeout)
+                except asyncio.TimeoutError:
+                    raise ResponseTimeoutError(corr_id, timeout)
+                if props is None:
+                    # the connection or channel was closed
+                    raise body
+                if ResponseStream.has_result(body, props):
+                    yield Producer.to_x_response(body, props)
+                if ResponseStream.is_end(props):
+                    return
+        finally:
+            self._streams.pop(corr_id, None)
+
+    async def _send(self, request: ProxyRequest, corr_id: str):
+        headers = request.message_headers
+        if request.chunks is not None:
+            chunk_queue = await self._declare_chunk_queue()
+            headers = {**headers, ChunkAssembler.QUEUE_HEADER: chunk_queue}
+        self._channel.basic_publish(
+            exchange=self.amqp_entities.exchange,
+            routing_key=self.amqp_entities.routing_key,
+            properties=pika.BasicProperties(
+                content_type=request.content_type,
+                content_encoding=request.encoding,
+                headers=headers,
+                reply_to=self._response_queue,
+                correlation_id=corr_id,
+                app_id=request.app_id,
+                delivery_mode=2,
+            ),
+            body=request.bytes,
+        )
+        if request.chunks is not None:
+            for chunk_headers, body in request.chunks:
+                self._channel.basic_publish(
+                    exchange="",
+                    routing_key=chunk_queue,
+                    properties=pika.BasicProperties(
+                        headers=chunk_headers, correlation_id=corr_id
+                    ),
+                    body=body,
+                )
+                await self._drain()
+
+    async def _declare_chunk_queue(self) -> str:
+        declared = asyncio.get_event_loop().create_future()
+        self._channel.queue_declare(
+            queue="",
+            auto_delete=True,
+            arguments={"x-expires": ChunkAssembler.QUEUE_EXPIRES},
+            callback=lambda frame: declared.set_result(frame.method.queue),
+        )
+        return await declared
+
+    async def _drain(self):
+        """
+        Waits for the connection to write its buffered data out,
+        so that a large request body is not buffered in memory at once.
+        """
+        await asyncio.sleep(0)
+        while (
+            self.is_open
+            and self._write_buffer_size() > self.WRITE_BUFFER_LIMIT
+        ):
+            await asyncio.sleep(self.DRAIN_INTERVAL)
+
+    def _write_buffer_size(self) -> int:
+        # pika does not notify when its transport drains, but it keeps
+        # the count of bytes waiting to be written to the socket
+        transport = getattr(self._connection, "_transport", None)
+        if transport is None:
+            return 0
+        return transport.get_write_buffer_size()
+
+    def _set_opened(self, err: Exception = None):
+        if self._opened is None or self._opened.done():
+            return
+        if err is None:
+            self._opened.set_result(None)
+        else:
+            self._opened.set_exception(err)
+
+    def _fail_pending(self, err: Exception):
+        pending, self._pending = self._pending, dict()
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(err)
+        for parts in self._streams.values():
+            parts.put_nowait((err, None))
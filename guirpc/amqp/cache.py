@@ -0,0 +1,406 @@
+import asyncio
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from threading import Lock
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+from weakref import WeakKeyDictionary
+
+from .chunks import ChunkAssembler, is_stream
+from .domain.objects import CacheStats, ProxyResponse
+from .utils import running_loop
+
+LOGGER = logging.getLogger("rpcClient")
+
+
+def request_key(faas_name: str, x_request) -> Optional[bytes]:
+    """
+    The key of a prepared request on the client, made of the FaaS name
+    and the serialized request (body and headers), that is None
+    for chunked requests.
+    """
+    if x_request.chunks is not None:
+        return None
+    headers = sorted((x_request.message_headers or {}).items())
+    digest = hashlib.sha256(f"{faas_name}\0{headers!r}\0".encode())
+    digest.update(x_request.bytes)
+    return digest.digest()
+
+
+# per-delivery headers that never take part in the key of a message,
+# besides the ones set by the broker (prefixed with "x-")
+TRANSPORT_HEADERS = (
+    ChunkAssembler.QUEUE_HEADER,
+    ChunkAssembler.SEQ_HEADER,
+    ChunkAssembler.LAST_HEADER,
+)
+
+
+def message_key(
+    body, headers: dict, ignore_headers: Iterable[str] = ()
+) -> Optional[bytes]:
+    """
+    The key of a request message on the server, made of its body hash
+    and its headers, as the serializer may need them to decode the body
+    (e.g. the Buffer-Format of a BufferSerializer, the Compression-Codec).
+    The TRANSPORT_HEADERS, broker headers and ignore_headers are left out.
+    It is None for chunked bodies.
+    """
+    if is_stream(body):
+        return None
+    ignored = (*TRANSPORT_HEADERS, *ignore_headers)
+    digest = hashlib.sha256(body)
+    for name, value in sorted((headers or {}).items()):
+        if name in ignored or name.startswith("x-"):
+            continue
+        digest.update(f"\0{name}={value!r}".encode())
+    return digest.digest()
+
+
+class ResponseCache:
+    """
+    This is a thread-safe LRU cache of encoded FaaS responses,
+    for FaaS whose response only depends on their request.
+
+    Responses are keyed by the request body hash and headers (the FaaS
+    name included) but the ignore_headers, see message_key. Only
+    successful (2xx) responses are cached, for up to ttl seconds,
+    and the least recently used ones are evicted beyond max_entries
+    or max_size bytes of bodies.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        max_size: int = 64 * 1024 * 1024,
+        ttl: float = 60.0,
+        ignore_headers: Iterable[str] = (),
+    ):
+        """
+        :param ttl: seconds a response is cached, forever if None.
+        :param ignore_headers: request headers the response
+            does not depend on (e.g. a tracing id).
+        """
+        self._max_entries = max_entries
+        self._max_size = max_size
+        self._ttl = ttl
+        self._ignore_headers = tuple(ignore_headers)
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                entries=len(self._entries),
+                size=self._size,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+    def key(self, body, headers: dict) -> Optional[bytes]:
+        """The cache key of a request message (see message_key)."""
+        return message_key(body, headers, self._ignore_headers)
+
+    def get(self, key: bytes) -> Optional[ProxyResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+        _, status, bytes_, encoding, content_type, headers = entry
+        x_resp = ProxyResponse(status)
+        x_resp.set_properties(
+            bytes_=bytes_,
+            encoding=encoding,
+            content_type=content_type,
+            message_headers=dict(headers),
+        )
+        return x_resp
+
+    def put(self, key: bytes, x_resp: ProxyResponse):
+        """Caches an encoded response, unless it is not successful."""
+        if not x_resp.is_success or x_resp.bytes is None:
+            return
+        bytes_ = bytes(x_resp.bytes)
+        if len(bytes_) > self._max_size:
+            return
+        expires = float("inf") if self._ttl is None else self._ttl
+        entry = (
+            time.monotonic() + expires,
+            x_resp.status_code,
+            bytes_,
+            x_resp.encoding,
+            x_resp.content_type,
+            dict(x_resp.message_headers or {}),
+        )
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._size += len(bytes_)
+            while (
+                len(self._entries) > self._max_entries
+                or self._size > self._max_size
+            ):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _remove(self, key: bytes):
+        entry = self._entries.pop(key)
+        self._size -= len(entry[2])
+
+
+class ClientCache:
+    """
+    This is a thread-safe LRU cache of decoded responses on the client,
+    so repeated requests skip the broker round trip entirely.
+
+    Responses are keyed by the FaaS name and the serialized request
+    (body and headers). Only successful (2xx) responses are cached,
+    they are fresh for ttl seconds. With stale_ttl, an expired response
+    is still served for up to stale_ttl more seconds while a single
+    background request refreshes it (stale-while-revalidate).
+    Cached ProxyResponse objects are shared, they must not be modified.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl: float = 30.0,
+        stale_ttl: float = 0.0,
+        refresh_workers: int = 2,
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl
+        self._stale_ttl = stale_ttl
+        self._refresh_workers = refresh_workers
+        self._executor = None
+        self._lock = Lock()
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @property
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                entries=len(self._entries),
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+    def fetch(self, key: bytes, load: Callable[[], ProxyResponse]):
+        """
+        Gets the cached response or loads it, calling load.
+
+        :param load: function that publishes the request.
+        """
+        x_resp, refresh = self._lookup(key)
+        if x_resp is None:
+            x_resp = load()
+            self.put(key, x_resp)
+        elif refresh:
+            self._get_executor().submit(self._refresh, key, load)
+        return x_resp
+
+    async def fetch_async(
+        self, key: bytes, load: Callable[[], Awaitable[ProxyResponse]]
+    ):
+        """Like fetch, for a load coroutine function."""
+        x_resp, refresh = self._lookup(key)
+        if x_resp is None:
+            x_resp = await load()
+            self.put(key, x_resp)
+        elif refresh:
+            asyncio.ensure_future(self._refresh_async(key, load))
+        return x_resp
+
+    def put(self, key: bytes, x_resp: ProxyResponse):
+        if not x_resp.is_success:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self._ttl, x_resp)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def close(self, wait: bool = True):
+        """Stops the background refreshes."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _lookup(self, key: bytes) -> Tuple[Optional[ProxyResponse], bool]:
+        """
+        :return: the fresh or stale response (None if there is none)
+            and whether the caller must refresh it.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now >= entry[0] + self._stale_ttl:
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self._misses += 1
+                return None, False
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+            fresh_until, x_resp = entry
+            refresh = now >= fresh_until and key not in self._refreshing
+            if refresh:
+                self._refreshing.add(key)
+            return x_resp, refresh
+
+    def _refresh(self, key: bytes, load: Callable[[], ProxyResponse]):
+        try:
+            self.put(key, load())
+        except Exception as err:
+            LOGGER.warning("Refreshing a cached response failed: %s", err)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    async def _refresh_async(self, key: bytes, load):
+        try:
+            self.put(key, await load())
+        except Exception as err:
+            LOGGER.warning("Refreshing a cached response failed: %s", err)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    self._refresh_workers, thread_name_prefix="guirpc-cache"
+                )
+            return self._executor
+
+
+class RequestCoalescer:
+    """
+    This collapses identical requests in flight (singleflight):
+    the first caller of a key publishes the request and the callers
+    arriving before its response wait for it, so all of them get the
+    same (shared) ProxyResponse, or exception, from a single message.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._calls: Dict[bytes, Future] = dict()
+        # tasks in flight by key, for each event loop
+        self._tasks: Dict[
+            asyncio.AbstractEventLoop, Dict[bytes, asyncio.Future]
+        ] = WeakKeyDictionary()
+        self._coalesced = 0
+
+    @property
+    def coalesced(self):
+        """Number of calls answered by another call in flight."""
+        with self._lock:
+            return self._coalesced
+
+    def call(self, key: bytes, load: Callable[[], ProxyResponse]):
+        """
+        :param load: function that publishes the request.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self._coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            x_resp = load()
+        except BaseException as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(x_resp)
+            return x_resp
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def call_async(
+        self, key: bytes, load: Callable[[], Awaitable[ProxyResponse]]
+    ):
+        """Like call, for a load coroutine function."""
+        # calls are only coalesced within the same event loop
+        loop = running_loop()
+        with self._lock:
+            tasks = self._tasks.setdefault(loop, dict())
+            task = tasks.get(key)
+            if task is not None:
+                self._coalesced += 1
+        if task is None:
+            task = tasks[key] = loop.create_task(load())
+            task.add_done_callback(lambda _: tasks.pop(key, None))
+        # a cancelled caller does not cancel the others
+        return await asyncio.shield(task)
+
+
+class DuplicateRequests:
+    """
+    This keeps track of the request messages being executed
+    by a FaaS with deduplication, and of the identical messages
+    received meanwhile, that are answered with the same response.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._duplicates: Dict[bytes, list] = dict()
+
+    def join(self, key: bytes, message: tuple) -> bool:
+        """
+        Registers a request message.
+
+        :return: True if an identical one is being executed, then the
+            message is kept as a duplicate of it, False otherwise.
+        """
+        with self._lock:
+            if key in self._duplicates:
+                self._duplicates[key].append(message)
+                return True
+            self._duplicates[key] = []
+            return False
+
+    def release(self, key: bytes) -> list:
+        """Ends the execution of a request, returning its duplicates."""
+        with self._lock:
+            return self._duplicates.pop(key, [])
@@ -0,0 +1,110 @@
+from tempfile import SpooledTemporaryFile
+from typing import Iterator, Tuple
+
+from .domain.encoding import BytesEncoder
+from .domain.exceptions import ChunkSequenceError
+
+
+def is_stream(body) -> bool:
+    """Whether the body is a binary file object instead of bytes."""
+    return hasattr(body, "read")
+
+
+def iter_chunks(
+    source, chunk_size: int, binary_codec: str = BytesEncoder.BINARY_CODECS[0]
+) -> Iterator[Tuple[dict, bytes]]:
+    """
+    Splits a request body into chunk messages, each chunk is encoded
+    with the binary codec on its own.
+
+    :param source: a bytes-like object, sliced without copying it,
+        or a binary file object, read chunk by chunk.
+    :return: the headers and the body of every chunk message.
+    """
+    if is_stream(source):
+        parts = iter(lambda: source.read(chunk_size), b"")
+    else:
+        parts = _slices(memoryview(source).cast("B"), chunk_size)
+
+    seq, part = 0, next(parts, b"")
+    while True:
+        following = next(parts, None)
+        yield {
+            ChunkAssembler.SEQ_HEADER: seq,
+            ChunkAssembler.LAST_HEADER: following is None,
+        }, BytesEncoder.encode(part, binary_codec)
+        if following is None:
+            return
+        seq, part = seq + 1, following
+
+
+def _slices(view: memoryview, size: int) -> Iterator[memoryview]:
+    for start in range(0, view.nbytes, size):
+        end = start + size
+        yield view[start:end]
+
+
+class ChunkAssembler:
+    """
+    Reassembles the chunk messages of a request body.
+
+    The head message of a chunked request has an empty body and names,
+    in its Chunk-Queue header, the temporary queue where the producer
+    publishes the chunks in sequence. The consumer reads that queue
+    on a channel of its own, as the broker closes the channel that
+    consumes from a queue that does not exist (anymore).
+
+    Chunks are decoded as they arrive and written to a spooled temporary
+    file, so only up to SPOOL_MAX_SIZE bytes are kept in memory
+    (the rest goes to disk).
+    """
+
+    QUEUE_HEADER = "Chunk-Queue"
+    SEQ_HEADER = "Chunk-Seq"
+    LAST_HEADER = "Chunk-Last"
+
+    SPOOL_MAX_SIZE = 8 * 1024 * 1024
+    # seconds to wait for the next chunk
+    TIMEOUT = 60.0
+    # milliseconds for the broker to delete an unused chunk queue
+    QUEUE_EXPIRES = 60 * 1000
+
+    def __init__(self, binary_codec: str = BytesEncoder.BINARY_CODECS[0]):
+        self._binary_codec = binary_codec
+        self._file = SpooledTemporaryFile(max_size=self.SPOOL_MAX_SIZE)
+        self._next_seq = 0
+        self.channel = None
+        self.timer = None
+        self.finished = False
+
+    @classmethod
+    def is_chunked(cls, headers: dict) -> bool:
+        return cls.QUEUE_HEADER in (headers or {})
+
+    @property
+    def size(self):
+        """Decoded bytes received so far."""
+        return self._file.tell()
+
+    def write(self, headers: dict, body: bytes) -> bool:
+        """
+        Appends a chunk to the body.
+
+        :return: whether it was the last chunk.
+        :raises ChunkSequenceError: if the chunk is out of sequence.
+        """
+        seq = headers.get(self.SEQ_HEADER)
+        if seq != self._next_seq:
+            raise ChunkSequenceError(self._next_seq, seq)
+        self._file.write(BytesEncoder.decode(body, self._binary_codec))
+        self._next_seq += 1
+        return bool(headers.get(self.LAST_HEADER))
+
+    @property
+    def body(self):
+        """The reassembled body, as a binary file object."""
+        self._file.seek(0)
+        return self._file
+
+    def close(self):
+        self._file.close()
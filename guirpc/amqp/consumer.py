@@ -1,16 +1,27 @@
+import asyncio
 import functools
 import logging
-from threading import Thread
-from queue import Queue
 import time
-from typing import Dict, Callable
+from typing import Dict, Callable, List
 
 import pika
 
+from guirpc.amqp.cache import DuplicateRequests, message_key
+from guirpc.amqp.chunks import ChunkAssembler, is_stream
 from guirpc.amqp.domain import ProxyResponse
-from guirpc.amqp.domain.contracts import ConsumerInterface
+from guirpc.amqp.domain.exceptions import (
+    ChunkSequenceError,
+    InvalidCompressionCodecError,
+)
+from guirpc.amqp.domain.objects import FaaSOptions, ServerOptions
+from guirpc.amqp.domain.contracts import (
+    ConsumerInterface,
+    WorkerPoolInterface,
+)
+from guirpc.amqp.dispatcher import OutboundDispatcher, RequestBatcher
 from guirpc.amqp.domain.encoding import StringEncoder, BytesEncoder
-from guirpc.amqp.serializers import TextSerializer
+from guirpc.amqp.serializers import SerializerRegistry, TextSerializer
+from guirpc.amqp.workers import ProcessFaaSPool, ThreadWorkerPool
 
 LOGGER = logging.getLogger("rpcServer")
 
@@ -27,26 +38,61 @@ class Consumer(ConsumerInterface):
 
     If the channel is closed, it will indicate a problem with one of the
     commands that were issued and that should surface in the output as well.
+
+    Deliveries can be spread over several consuming channels of the same
+    connection ('channels' option), each one with its own QoS and consumer
+    tag, all of them sharing the worker pool.
     """
 
-    def __init__(self, faas_callables: Dict[str, Callable], *args, **kwargs):
+    CONNECTION_CLASS = pika.SelectConnection
+
+    def __init__(
+        self,
+        faas_callables: Dict[str, Callable],
+        *args,
+        worker_pool: WorkerPoolInterface = None,
+        process_pool: ProcessFaaSPool = None,
+        **kwargs,
+    ):
         super(Consumer, self).__init__(*args, **kwargs)
         self._faas_callables = faas_callables
-        self._queue = Queue(self.max_workers)
+        self._worker_pool = worker_pool or ThreadWorkerPool(self.max_workers)
+        self._process_pool = process_pool
         self._init_state()
 
     def _init_state(self):
         self._connection = None
         self._channel = None
+        self._consuming_channels = []
         self._closing = False
-        self._consumer_tag = None
+        self._consumer_tags = dict()
         self._consuming = False
         self._should_reconnect = False
+        self._dispatcher = None
+        self._duplicates = DuplicateRequests()
+        # messages being received or processed, only used from the IO loop
+        self._in_flight = 0
+        self._draining = False
+        self._batcher = RequestBatcher(
+            self.dispatch_batch, self.call_later, self.cancel_call
+        )
 
     @property
     def faas_callables(self):
         return self._faas_callables
 
+    @property
+    def worker_pool(self):
+        return self._worker_pool
+
+    @property
+    def process_pool(self):
+        return self._process_pool
+
+    @property
+    def replies_published(self):
+        return self._dispatcher.published if self._dispatcher else 0
+
     @property
     def should_reconnect(self):
         return self._should_reconnect
@@ -58,13 +104,17 @@ class Consumer(ConsumerInterface):
             self.amqp_url.replace(":%s" % passw, ":" + "*" * 8),
         )
 
-        return pika.SelectConnection(
+        return self.CONNECTION_CLASS(
             parameters=pika.URLParameters(self.amqp_url),
             on_open_callback=self.on_connection_open,
             on_open_error_callback=self.on_connection_open_error,
             on_close_callback=self.on_connection_closed,
+            **self.connection_options(),
         )
 
+    def connection_options(self) -> dict:
+        return dict()
+
     def close_connection(self):
         self._consuming = False
         if self._connection.is_closing or self._connection.is_closed:
@@ -83,6 +133,7 @@ class Consumer(ConsumerInterface):
 
     def on_connection_closed(self, _unused_connection, reason):
         self._channel = None
+        self._consuming_channels = []
         if self._closing:
             self._connection.ioloop.stop()
         else:
@@ -102,15 +153,38 @@ class Consumer(ConsumerInterface):
     def on_channel_open(self, channel):
         LOGGER.info("Channel opened")
         self._channel = channel
+        self._consuming_channels.append(channel)
         self.add_on_channel_close_callback()
         self.setup_exchange(self.amqp_entities.exchange)
 
-    def add_on_channel_close_callback(self):
+    def open_consuming_channels(self):
+        """Opens the extra channels that consume from the same queue."""
+        for _ in range(self.channels - 1):
+            self._connection.channel(
+                on_open_callback=self.on_consuming_channel_open
+            )
+
+    def on_consuming_channel_open(self, channel):
+        LOGGER.info("Consuming channel %i opened", channel.channel_number)
+        self._consuming_channels.append(channel)
+        self.add_on_channel_close_callback(channel)
+        self.set_qos(channel)
+
+    def add_on_channel_close_callback(self, channel=None):
         LOGGER.info("Adding channel close callback")
-        self._channel.add_on_close_callback(self.on_channel_closed)
+        (channel or self._channel).add_on_close_callback(
+            self.on_channel_closed
+        )
 
     def on_channel_closed(self, channel, reason):
         LOGGER.warning("Channel %i was closed: %s", channel, reason)
+        if self._closing and any(
+            not other.is_closed
+            for other in self._consuming_channels
+            if other is not channel
+        ):
+            # the other consuming channels are being closed too
+            return
         self.close_connection()
 
     def setup_exchange(self, exchange_name):
@@ -154,91 +228,470 @@ class Consumer(ConsumerInterface):
     def on_bindok(self, _unused_frame, userdata):
         LOGGER.info("Queue bound: %s", userdata)
         self.set_qos()
+        self.open_consuming_channels()
 
-    def set_qos(self):
-        self._channel.basic_qos(
-            prefetch_count=self.prefetch_count, callback=self.on_basic_qos_ok
-        )
+    def set_qos(self, channel=None):
+        channel = channel or self._channel
+        cb = functools.partial(self.on_basic_qos_ok, channel=channel)
+        channel.basic_qos(prefetch_count=self.prefetch_count, callback=cb)
 
-    def on_basic_qos_ok(self, _unused_frame):
-        LOGGER.info("QOS set to: %d", self.prefetch_count)
-        self.start_consuming()
+    def on_basic_qos_ok(self, _unused_frame, channel):
+        LOGGER.info(
+            "QOS of channel %i set to: %d",
+            channel.channel_number,
+            self.prefetch_count,
+        )
+        self.start_consuming(channel)
 
-    def start_consuming(self):
+    def start_consuming(self, channel=None):
+        channel = channel or self._channel
         LOGGER.info("Issuing consumer related RPC commands")
-        self.add_on_cancel_callback()
-        self._consumer_tag = self._channel.basic_consume(
+        self.add_on_cancel_callback(channel)
+        self._consumer_tags[channel.channel_number] = channel.basic_consume(
             self.amqp_entities.queue, self.on_message
         )
         self._consuming = True
 
-    def add_on_cancel_callback(self):
+    def add_on_cancel_callback(self, channel=None):
         LOGGER.info("Adding consumer cancellation callback")
-        self._channel.add_on_cancel_callback(self.on_consumer_cancelled)
+        (channel or self._channel).add_on_cancel_callback(
+            self.on_consumer_cancelled
+        )
 
     def on_consumer_cancelled(self, method_frame):
         LOGGER.info(
             "Consumer was cancelled remotely, shutting down: %r", method_frame
         )
-        if self._channel:
-            self._channel.close()
+        self.close_channels()
 
     def on_message(self, _ch, basic_deliver, properties, body):
-        """Handles message multi-threading."""
-        # if the queue size is reached,
-        # it blocks until a free slot is available
-        self._queue.put(basic_deliver.delivery_tag, block=True)
-        th = Thread(
-            target=self.process_message,
-            args=(_ch, basic_deliver, properties, body),
+        self._dispatcher.track(_ch, basic_deliver.delivery_tag)
+        if ChunkAssembler.is_chunked(properties.headers):
+            self.receive_chunks(_ch, basic_deliver, properties)
+        elif not self.join_duplicates(_ch, basic_deliver, properties, body):
+            self.submit_message(_ch, basic_deliver, properties, body)
+
+    def submit_message(self, _ch, basic_deliver, properties, body):
+        """
+        Dispatches the message, or buffers it in the batch of its FaaS
+        if the FaaS handles its requests in batches. Buffered messages
+        are acknowledged right away with early acks, so that they do
+        not hold the prefetch while their batch fills up.
+        """
+        faas_name = properties.headers.get("FaaS-Name")
+        faas = self.faas_callables.get(faas_name)
+        options = FaaSOptions.of(faas) if faas is not None else None
+        if options is None or not options.batch_size:
+            self.dispatch_message(_ch, basic_deliver, properties, body)
+            return
+        if self.ack_mode == ServerOptions.ACK_EARLY:
+            self.acknowledge_message(basic_deliver.delivery_tag, _ch)
+        self._batcher.add(
+            faas_name,
+            (_ch, basic_deliver, properties, body),
+            options.batch_size,
+            options.max_wait_ms,
         )
-        th.start()
 
-    def process_message(self, _ch, basic_deliver, properties, body):
-        tag = basic_deliver.delivery_tag
-        faas_name = properties.headers.get("FaaS-Name")
-        self.acknowledge_message(tag)
+    def duplicate_key(self, faas_name, body, properties):
+        """The key of a request to a FaaS with deduplication or None."""
+        faas = self.faas_callables.get(faas_name)
+        if faas is None or not FaaSOptions.of(faas).deduplicate:
+            return None
+        return message_key(body, properties.headers)
+
+    def join_duplicates(self, _ch, basic_deliver, properties, body) -> bool:
+        """
+        Keeps the message as a duplicate if an identical request
+        is being executed, its reply is published along with that one.
+
+        :return: whether the message is a duplicate.
+        """
+        key = self.duplicate_key(
+            properties.headers.get("FaaS-Name"), body, properties
+        )
+        if key is None or not self._duplicates.join(
+            key, (_ch, basic_deliver, properties)
+        ):
+            return False
+
         LOGGER.info(
-            f"#{tag} Received message -> requests FaaS: {faas_name} "
+            f"#{basic_deliver.delivery_tag} Received message -> "
+            "duplicate of a request in progress "
             "[corr_id='%s' app_id='%s']"
             % (properties.correlation_id, properties.app_id)
         )
+        if self.ack_mode == ServerOptions.ACK_EARLY:
+            self.acknowledge_message(basic_deliver.delivery_tag, _ch)
+        return True
+
+    def reply_duplicates(self, faas_name, body, properties, x_resp):
+        """Publishes the response of a request to its duplicates."""
+        key = self.duplicate_key(faas_name, body, properties)
+        if key is None:
+            return
+        duplicates = self._duplicates.release(key)
+        if duplicates and x_resp is None:
+            x_resp = self.error_response(
+                500,
+                "[ServerError] The processing of an identical request failed",
+                BytesEncoder.codec_of(properties.headers),
+            )
+        for _ch, basic_deliver, dup_properties in duplicates:
+            self.reply_message(
+                _ch, basic_deliver, dup_properties, faas_name, x_resp
+            )
+            if self.ack_mode != ServerOptions.ACK_EARLY:
+                self.acknowledge_message(basic_deliver.delivery_tag, _ch)
+
+    def receive_chunks(self, _ch, basic_deliver, properties):
+        """
+        Consumes the chunks of a request body from its chunk queue,
+        the request is dispatched once its body is reassembled.
+        """
+        assembler = ChunkAssembler(BytesEncoder.codec_of(properties.headers))
+        self._in_flight += 1
+        self.restart_chunks_timer(_ch, assembler, basic_deliver, properties)
+        self._connection.channel(
+            on_open_callback=functools.partial(
+                self.on_chunk_channel_open,
+                _ch=_ch,
+                assembler=assembler,
+                basic_deliver=basic_deliver,
+                properties=properties,
+            )
+        )
+
+    def on_chunk_channel_open(
+        self, chunk_ch, _ch, assembler, basic_deliver, properties
+    ):
+        if assembler.finished:
+            # it timed out while the channel was being opened
+            chunk_ch.close()
+            return
+        assembler.channel = chunk_ch
+        chunk_ch.add_on_close_callback(
+            functools.partial(
+                self.on_chunk_channel_closed,
+                _ch=_ch,
+                assembler=assembler,
+                basic_deliver=basic_deliver,
+                properties=properties,
+            )
+        )
+        chunk_ch.basic_consume(
+            properties.headers[ChunkAssembler.QUEUE_HEADER],
+            functools.partial(
+                self.on_chunk,
+                _ch=_ch,
+                assembler=assembler,
+                basic_deliver=basic_deliver,
+                properties=properties,
+            ),
+            auto_ack=True,
+        )
+
+    def on_chunk_channel_closed(
+        self, _chunk_ch, reason, _ch, assembler, basic_deliver, properties
+    ):
+        # e.g. the chunk queue does not exist, only this request fails
+        if not assembler.finished:
+            self.reject_chunks(
+                _ch,
+                assembler,
+                basic_deliver,
+                properties,
+                f"The chunks of the request body cannot be read: {reason}",
+            )
+
+    def on_chunk(
+        self,
+        _chunk_ch,
+        _chunk_deliver,
+        chunk_properties,
+        chunk,
+        _ch,
+        assembler,
+        basic_deliver,
+        properties,
+    ):
+        if assembler.finished:
+            return
+        try:
+            is_last = assembler.write(chunk_properties.headers, chunk)
+        except ChunkSequenceError as err:
+            self.reject_chunks(
+                _ch, assembler, basic_deliver, properties, str(err)
+            )
+            return
 
-        if faas_name not in self.faas_callables.keys():
-            is_err, status, err_msg = (
-                True,
-                400,
-                f"[RequestError] FaaS with name '{faas_name}' "
-                "is not registered",
+        if not is_last:
+            self.restart_chunks_timer(
+                _ch, assembler, basic_deliver, properties
             )
+            return
+        self.finish_chunks(assembler)
+        LOGGER.info(
+            f"#{basic_deliver.delivery_tag} Received request body "
+            f"in chunks ({assembler.size} bytes)"
+        )
+        self.submit_message(_ch, basic_deliver, properties, assembler.body)
+
+    def finish_chunks(self, assembler):
+        """Stops reading the chunk queue of a request."""
+        if not assembler.finished:
+            self.on_processing_done()
+        assembler.finished = True
+        self.cancel_call(assembler.timer)
+        chunk_ch = assembler.channel
+        if chunk_ch is not None and chunk_ch.is_open:
+            chunk_ch.close()
+
+    def restart_chunks_timer(self, _ch, assembler, basic_deliver, properties):
+        if assembler.timer is not None:
+            self.cancel_call(assembler.timer)
+        assembler.timer = self.call_later(
+            ChunkAssembler.TIMEOUT,
+            functools.partial(
+                self.reject_chunks,
+                _ch,
+                assembler,
+                basic_deliver,
+                properties,
+                "Timed out waiting for the next chunk of the request body",
+            ),
+        )
+
+    def reject_chunks(self, _ch, assembler, basic_deliver, properties, reason):
+        """Replies an error to a chunked request that cannot be completed."""
+        self.finish_chunks(assembler)
+        assembler.close()
+        LOGGER.error(f"#{basic_deliver.delivery_tag} {reason}")
+
+        x_resp = self.error_response(
+            400,
+            f"[RequestError] {reason}",
+            BytesEncoder.codec_of(properties.headers),
+        )
+        faas_name = properties.headers.get("FaaS-Name")
+        self.reply_message(_ch, basic_deliver, properties, faas_name, x_resp)
+        self.acknowledge_message(basic_deliver.delivery_tag, _ch)
+
+    def dispatch_message(self, _ch, basic_deliver, properties, body):
+        """Handles message multi-threading."""
+        # if all workers are busy,
+        # it blocks until a free worker is available
+        self._in_flight += 1
+        future = self._worker_pool.submit(
+            self.process_message, _ch, basic_deliver, properties, body
+        )
+        future.add_done_callback(
+            functools.partial(
+                self.on_message_processed, tag=basic_deliver.delivery_tag
+            )
+        )
+        if is_stream(body):
+            future.add_done_callback(lambda _: body.close())
+
+    def on_message_processed(self, future, tag):
+        self.call_threadsafe(self.on_processing_done)
+        err = future.exception()
+        if err:
+            LOGGER.error(
+                f"#{tag} Message processing failed: "
+                f"'{err.__class__.__name__} -> {err}'"
+            )
+
+    def on_processing_done(self):
+        self._in_flight -= 1
+        if self._draining and not self._in_flight:
+            self._draining = False
+            self.close_when_drained()
+
+    def process_message(self, _ch, basic_deliver, properties, body):
+        """
+        Acknowledges the message according to the ack_mode,
+        either before handling it or once its reply is published.
+        """
+        tag = basic_deliver.delivery_tag
+        if self.ack_mode == ServerOptions.ACK_EARLY:
+            self.acknowledge_message(tag, _ch)
+            self.handle_message(_ch, basic_deliver, properties, body)
         else:
-            faas = self.faas_callables[faas_name]
             try:
-                x_resp = faas(body, properties)
-                is_err = False
-            except Exception as err:
-                is_err, status, err_msg = (
-                    True,
-                    500,
-                    "[ServerError] An unexpected error occurred "
-                    "while processing the request message: "
-                    f"'{err.__class__.__name__} -> {err}'",
+                self.handle_message(_ch, basic_deliver, properties, body)
+            finally:
+                self.acknowledge_message(tag, _ch)
+
+    def handle_message(self, _ch, basic_deliver, properties, body):
+        faas_name = self.log_received_message(basic_deliver, properties)
+        x_resp = None
+        try:
+            x_resp = self.call_faas(faas_name, body, properties)
+            if isinstance(x_resp, ProxyResponse):
+                self.reply_message(
+                    _ch, basic_deliver, properties, faas_name, x_resp
                 )
-
-        if is_err:
-            x_resp = ProxyResponse(status, error_message=err_msg)
-            resp_bytes = StringEncoder.encode(x_resp.error_message)
-            body = BytesEncoder.encode(resp_bytes)
-            x_resp.set_properties(
-                bytes_=body,
-                encoding=TextSerializer.ENCODING,
-                content_type=TextSerializer.CONTENT_TYPE,
-                message_headers={
-                    "Response-Status": x_resp.status_code,
-                    "Response-Serializer": TextSerializer.__name__,
-                },
+            else:
+                self.reply_stream(
+                    _ch, basic_deliver, properties, faas_name, x_resp
+                )
+        finally:
+            self.reply_duplicates(faas_name, body, properties, x_resp)
+
+    def dispatch_batch(self, faas_name, messages):
+        """Runs a batch of messages of a FaaS on a worker."""
+        self._in_flight += 1
+        future = self._worker_pool.submit(
+            self.process_batch, faas_name, messages
+        )
+        future.add_done_callback(
+            functools.partial(
+                self.on_message_processed,
+                tag=messages[0][1].delivery_tag,
+            )
+        )
+        future.add_done_callback(lambda _: self.close_bodies(messages))
+
+    @staticmethod
+    def close_bodies(messages):
+        for _ch, _basic_deliver, _properties, body in messages:
+            if is_stream(body):
+                body.close()
+
+    def process_batch(self, faas_name, messages):
+        """
+        Acknowledges the messages of a batch once their replies are
+        published, with early acks they were acknowledged on receipt.
+        """
+        if self.ack_mode == ServerOptions.ACK_EARLY:
+            self.handle_batch(faas_name, messages)
+        else:
+            try:
+                self.handle_batch(faas_name, messages)
+            finally:
+                for _ch, basic_deliver, _properties, _body in messages:
+                    self.acknowledge_message(basic_deliver.delivery_tag, _ch)
+
+    def handle_batch(self, faas_name, messages):
+        """
+        Calls the batch FaaS once for all the messages and replies
+        each response to the correlation id of its request.
+        """
+        for _ch, basic_deliver, properties, _body in messages:
+            self.log_received_message(basic_deliver, properties)
+        x_resps = [None] * len(messages)
+        try:
+            x_resps = self.call_batch_faas(faas_name, messages)
+            for message, x_resp in zip(messages, x_resps):
+                _ch, basic_deliver, properties, _body = message
+                self.reply_message(
+                    _ch, basic_deliver, properties, faas_name, x_resp
+                )
+        finally:
+            for message, x_resp in zip(messages, x_resps):
+                _ch, _basic_deliver, properties, body = message
+                self.reply_duplicates(faas_name, body, properties, x_resp)
+
+    def call_batch_faas(self, faas_name, messages) -> List[ProxyResponse]:
+        faas = self.faas_callables[faas_name]
+        try:
+            return faas(
+                [(body, properties) for _, _, properties, body in messages]
             )
-        _ch.basic_publish(
+        except Exception as err:
+            return [
+                self.server_error_response(
+                    err, BytesEncoder.codec_of(properties.headers)
+                )
+                for _, _, properties, _ in messages
+            ]
+
+    def log_received_message(self, basic_deliver, properties) -> str:
+        faas_name = properties.headers.get("FaaS-Name")
+        LOGGER.info(
+            f"#{basic_deliver.delivery_tag} Received message -> "
+            f"requests FaaS: {faas_name} "
+            "[corr_id='%s' app_id='%s']"
+            % (properties.correlation_id, properties.app_id)
+        )
+        return faas_name
+
+    def call_faas(self, faas_name, body, properties) -> ProxyResponse:
+        faas = self.faas_callables.get(faas_name)
+        binary_codec = BytesEncoder.codec_of(properties.headers)
+        if faas is None:
+            return self.not_registered_response(faas_name, binary_codec)
+
+        try:
+            if self.runs_in_process(faas):
+                return self._process_pool.call(faas_name, body, properties)
+            if asyncio.iscoroutinefunction(faas):
+                return _run_coroutine(faas(body, properties))
+            return faas(body, properties)
+        except InvalidCompressionCodecError as err:
+            return self.request_error_response(err, binary_codec)
+        except Exception as err:
+            return self.server_error_response(err, binary_codec)
+
+    def runs_in_process(self, faas) -> bool:
+        return (
+            self._process_pool is not None
+            and FaaSOptions.of(faas).execution == FaaSOptions.EXECUTION_PROCESS
+        )
+
+    @staticmethod
+    def error_response(
+        status, err_msg, binary_codec=BytesEncoder.BINARY_CODECS[0]
+    ) -> ProxyResponse:
+        x_resp = ProxyResponse(status, error_message=err_msg)
+        resp_bytes = StringEncoder.encode(x_resp.error_message)
+        body = BytesEncoder.encode(resp_bytes, binary_codec)
+        x_resp.set_properties(
+            bytes_=body,
+            encoding=TextSerializer.ENCODING,
+            content_type=TextSerializer.CONTENT_TYPE,
+            message_headers={
+                "Response-Status": x_resp.status_code,
+                "Response-Serializer": SerializerRegistry.name_of(
+                    TextSerializer
+                ),
+                BytesEncoder.HEADER: binary_codec,
+            },
+        )
+        return x_resp
+
+    @classmethod
+    def not_registered_response(
+        cls, faas_name, binary_codec=BytesEncoder.BINARY_CODECS[0]
+    ) -> ProxyResponse:
+        return cls.error_response(
+            400,
+            f"[RequestError] FaaS with name '{faas_name}' is not registered",
+            binary_codec,
+        )
+
+    @classmethod
+    def request_error_response(
+        cls, err, binary_codec=BytesEncoder.BINARY_CODECS[0]
+    ) -> ProxyResponse:
+        return cls.error_response(400, f"[RequestError] {err}", binary_codec)
+
+    @classmethod
+    def server_error_response(
+        cls, err, binary_codec=BytesEncoder.BINARY_CODECS[0]
+    ) -> ProxyResponse:
+        return cls.error_response(
+            500,
+            "[ServerError] An unexpected error occurred "
+            "while processing the request message: "
+            f"'{err.__class__.__name__} -> {err}'",
+            binary_codec,
+        )
+
+    def reply_message(self, _ch, basic_deliver, properties, faas_name, x_resp):
+        self._dispatcher.publish(
+            _ch,
             exchange="",
             routing_key=properties.reply_to,
             properties=pika.BasicProperties(
@@ -251,52 +704,130 @@ class Consumer(ConsumerInterface):
         )
 
         LOGGER.info(
-            f"#{tag} Reply published  -> response FaaS: {faas_name} "
+            f"#{basic_deliver.delivery_tag} Reply published  -> "
+            f"response FaaS: {faas_name} "
             "[routing_key='%s']" % properties.reply_to
         )
 
-        # get() fetches a task and removes it from the queue and a subsequent
-        # task_done() call tells the queue that the task has been processed.
-        self._queue.get(tag)
-        self._queue.task_done()
+    def reply_stream(self, _ch, basic_deliver, properties, faas_name, x_resps):
+        """
+        Replies each partial response of a generator FaaS as it is
+        produced, it runs the FaaS so it must be called from a worker.
+        """
+        for x_resp in x_resps:
+            self.reply_message(
+                _ch, basic_deliver, properties, faas_name, x_resp
+            )
 
-    def acknowledge_message(self, delivery_tag):
-        self._channel.basic_ack(delivery_tag)
+    def acknowledge_message(self, delivery_tag, channel=None):
+        self._dispatcher.ack(channel or self._channel, delivery_tag)
 
     def stop_consuming(self):
-        if self._channel:
+        # the buffered requests are not left waiting for their batch
+        self._batcher.flush_all()
+        for channel in self._consuming_channels:
+            consumer_tag = self._consumer_tags.get(channel.channel_number)
+            if not consumer_tag or not channel.is_open:
+                continue
             LOGGER.info("Sending a Basic.Cancel RPC command to RabbitMQ")
-            cb = functools.partial(
-                self.on_cancelok, userdata=self._consumer_tag
-            )
-            self._channel.basic_cancel(self._consumer_tag, cb)
+            cb = functools.partial(self.on_cancelok, userdata=consumer_tag)
+            channel.basic_cancel(consumer_tag, cb)
 
     def on_cancelok(self, _unused_frame, userdata):
-        self._consuming = False
         LOGGER.info(
             "RabbitMQ acknowledged the cancellation of the consumer: %s",
             userdata,
         )
-        self.close_channel()
-
-    def close_channel(self):
-        LOGGER.info("Closing the channel")
-        self._channel.close()
+        self._consumer_tags = {
+            number: tag
+            for number, tag in self._consumer_tags.items()
+            if tag != userdata
+        }
+        if not self._consumer_tags:
+            self._consuming = False
+            self.close_when_drained()
+
+    def close_when_drained(self):
+        """
+        Closes the channels once the messages in flight are processed
+        and their replies and acks are published, it runs on the IO loop.
+        """
+        if self._in_flight:
+            LOGGER.info(
+                "Waiting for %d messages in flight before closing",
+                self._in_flight,
+            )
+            self._draining = True
+            return
+        self._dispatcher.flush()
+        self.close_channels()
+
+    def close_channels(self):
+        for channel in self._consuming_channels:
+            if channel.is_open:
+                LOGGER.info("Closing channel %i", channel.channel_number)
+                channel.close()
+
+    def check_batch_prefetch(self):
+        """
+        Warns about the batch FaaS that can never fill up a batch,
+        with late acks a consumer holds at most channels * prefetch_count
+        unacknowledged messages.
+        """
+        if self.ack_mode == ServerOptions.ACK_EARLY:
+            return
+        prefetch = self.channels * self.prefetch_count
+        for faas_name, faas in self.faas_callables.items():
+            batch_size = FaaSOptions.of(faas).batch_size
+            if batch_size and batch_size > prefetch:
+                LOGGER.warning(
+                    "FaaS '%s' batch_size %d exceeds channels * "
+                    "prefetch_count (%d), its batches never fill up "
+                    "with %s acks",
+                    faas_name,
+                    batch_size,
+                    prefetch,
+                    self.ack_mode,
+                )
 
     def run(self):
+        self.check_batch_prefetch()
         self._connection = self.connect()
+        # acks and replies are published by the IO loop thread only
+        self._dispatcher = OutboundDispatcher(
+            self.call_threadsafe,
+            combine_acks=self.ack_mode != ServerOptions.ACK_LATE,
+            hold_acks=self.ack_mode == ServerOptions.ACK_LATE_BATCHED,
+        )
+        self.start_ioloop()
+
+    def start_ioloop(self):
         self._connection.ioloop.start()
 
+    def call_threadsafe(self, callback):
+        self._connection.ioloop.add_callback_threadsafe(callback)
+
+    def call_later(self, delay: float, callback):
+        """Schedules a callback on the IO loop, it must be called from it."""
+        return self._connection.ioloop.call_later(delay, callback)
+
+    def cancel_call(self, handle):
+        if handle is not None:
+            self._connection.ioloop.remove_timeout(handle)
+
     def stop(self):
         if not self._closing:
             self._closing = True
             LOGGER.info("Stopping")
             if self._consuming:
                 self.stop_consuming()
-                self._connection.ioloop.start()
+                self.start_ioloop()
             else:
                 self._connection.ioloop.stop()
-            LOGGER.info("Stopped")
+            LOGGER.info(
+                "Stopped; worker pool stats: %s",
+                self._worker_pool.stats.as_dict,
+            )
 
 
 class ProxyReconnectConsumer(ConsumerInterface):
@@ -306,11 +837,38 @@ class ProxyReconnectConsumer(ConsumerInterface):
     """
 
     MAX_RECONNECT_DELAY = 300
-
-    def __init__(self, faas_callables: Dict[str, Callable], *args, **kwargs):
+    CONSUMER_CLASS = Consumer
+
+    def __init__(
+        self,
+        faas_callables: Dict[str, Callable],
+        *args,
+        worker_pool: WorkerPoolInterface = None,
+        faas_loader: Callable[[], Dict[str, Callable]] = None,
+        process_workers: int = 0,
+        **kwargs,
+    ):
         super(ProxyReconnectConsumer, self).__init__(*args, **kwargs)
         self._reconnect_delay = 0
-        self._consumer = Consumer(faas_callables, *args, **kwargs)
+        # worker pools outlive the nested consumers across reconnections
+        self._worker_pool = worker_pool or ThreadWorkerPool(self.max_workers)
+        self._process_pool = self._create_process_pool(
+            faas_callables, faas_loader, process_workers
+        )
+        self._consumer = self._create_consumer(faas_callables)
+        self._replies_published = 0
+
+    @property
+    def worker_pool(self):
+        return self._worker_pool
+
+    @property
+    def replies_published(self):
+        return self._replies_published + self._consumer.replies_published
+
+    @property
+    def process_pool(self):
+        return self._process_pool
 
     def run(self):
         while True:
@@ -318,6 +876,9 @@ class ProxyReconnectConsumer(ConsumerInterface):
                 self._consumer.run()
             except KeyboardInterrupt:
                 self._consumer.stop()
+                self._worker_pool.shutdown()
+                if self._process_pool:
+                    self._process_pool.shutdown()
                 break
             LOGGER.info("Reconnection evaluation")
             self._maybe_reconnect()
@@ -330,7 +891,10 @@ class ProxyReconnectConsumer(ConsumerInterface):
                 "Reconnecting attempt after %d seconds", self._reconnect_delay
             )
             time.sleep(self._reconnect_delay)
-            self._consumer = self._create_new_consumer()
+            self._replies_published += self._consumer.replies_published
+            self._consumer = self._create_consumer(
+                self._consumer.faas_callables
+            )
 
     def _update_reconnect_delay(self):
         self._reconnect_delay += max(1, self._reconnect_delay // 0.67)
@@ -338,10 +902,44 @@ class ProxyReconnectConsumer(ConsumerInterface):
             self._reconnect_delay, self.MAX_RECONNECT_DELAY
         )
 
-    def _create_new_consumer(self):
-        return Consumer(
-            self._consumer.faas_callables,
+    @staticmethod
+    def _create_process_pool(faas_callables, faas_loader, process_workers):
+        process_faas = [
+            name
+            for name, faas in faas_callables.items()
+            if FaaSOptions.of(faas).execution == FaaSOptions.EXECUTION_PROCESS
+        ]
+        if not process_faas:
+            return None
+        if not faas_loader:
+            LOGGER.warning(
+                "No FaaS loader provided, process FaaS will run "
+                "on the worker threads: %s" % ", ".join(process_faas)
+            )
+            return None
+
+        return ProcessFaaSPool(faas_loader, max_workers=process_workers)
+
+    def _create_consumer(self, faas_callables):
+        return self.CONSUMER_CLASS(faas_callables, **self._consumer_options())
+
+    def _consumer_options(self) -> dict:
+        return dict(
             amqp_url=self.amqp_url,
             amqp_entities=self.amqp_entities,
+            max_workers=self.max_workers,
             prefetch_count=self.prefetch_count,
+            ack_mode=self.ack_mode,
+            channels=self.channels,
+            worker_pool=self._worker_pool,
+            process_pool=self._process_pool,
         )
+
+
+def _run_coroutine(coro):
+    """Runs a coroutine to completion from a worker thread."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
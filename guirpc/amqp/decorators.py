@@ -1,16 +1,43 @@
+import asyncio
+import functools
+import inspect
 import pickle
-from typing import Type, Callable
+from collections import deque
+from itertools import islice
+from typing import (
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 
 from pika import BasicProperties
-from pika.exceptions import StreamLostError
 
-from .domain.contracts import BaseSerializer
-from .domain.encoding import StringEncoder, BytesEncoder
-from .domain.exceptions import SerializationError
-from .domain.objects import ProxyRequest, ProxyResponse
-from .producer import Producer
-from .serializers import TextSerializer, BinarySerializer
-from .utils import ClientConnector
+from .cache import (
+    ClientCache,
+    RequestCoalescer,
+    ResponseCache,
+    request_key,
+)
+from .chunks import ChunkAssembler, is_stream, iter_chunks
+from .domain.contracts import BaseBinarySerializer, BaseSerializer
+from .domain.encoding import BytesEncoder, CompressionEncoder, StringEncoder
+from .domain.exceptions import InvalidFaaSOptionError, SerializationError
+from .domain.objects import FaaSOptions, ProxyRequest, ProxyResponse
+from .producer import Producer, ResponseStream
+from .serializers import (
+    BinarySerializer,
+    SerializerRegistry,
+    StreamSerializer,
+    TextSerializer,
+)
+from .utils import AsyncClientConnector, ClientConnector
 
 
 def connection_is_open(client_con):
@@ -30,11 +57,22 @@ def register_faas(
     resp_sz: Type[BaseSerializer],
     req_codec: str = None,
     resp_codec: str = None,
+    execution: str = FaaSOptions.EXECUTION_THREAD,
+    compression: str = None,
+    compression_threshold: int = 1024,
+    cache: Union[ResponseCache, bool] = None,
+    deduplicate: bool = False,
+    batch_size: int = None,
+    max_wait_ms: float = 10.0,
 ) -> Callable:
     """
     Decorator for registering FaaS application functions.
     Each decorated function of this type will be a callable
     passed to the consumer.
+    The decorated function can also be a coroutine function (async def),
+    an asyncio consumer runs them concurrently on its event loop,
+    or a generator function that yields partial results (objects or
+    ProxyResponse), each one is replied as soon as it is yielded.
 
     :param req_sz: Request serializer type.
     :param resp_sz: Response serializer type.
@@ -42,120 +80,461 @@ def register_faas(
                       the default value comes from req_sz.
     :param resp_codec: Response encoding. If not provided,
                        the default value comes from resp_sz.
+    :param execution: 'thread' (default) or 'process'. Process FaaS
+                      run on a pool of child processes owned by the
+                      consumer, so CPU-bound functions are not
+                      serialized by the GIL.
+    :param compression: Response compression codec (zlib, bz2 or lzma),
+                        responses are not compressed if not provided.
+    :param compression_threshold: Minimum response size in bytes
+                                  to be compressed.
+    :param cache: ResponseCache of the encoded responses (or True
+                  for a default one), only for deterministic FaaS.
+                  Process FaaS have a cache per child process.
+    :param deduplicate: Identical requests (same body and headers, see
+                        cache.message_key) received while one of them
+                        is being executed get its response as their reply,
+                        the FaaS runs once for all of them.
+    :param batch_size: If provided, the decorated function receives a list
+                       of up to batch_size ProxyRequest and returns
+                       the list of their ProxyResponse (in the same order).
+                       The consumer buffers the requests to the FaaS until
+                       there are batch_size of them, or for max_wait_ms
+                       since the first one. With late acks, the buffered
+                       requests count against the prefetch, so it needs
+                       channels * prefetch_count >= batch_size.
+    :param max_wait_ms: Maximum milliseconds a request waits for its batch.
     :return: The function wrapper that calls decorated function
         with the proper decoding and encoding response process.
     """
+    if cache is True:
+        cache = ResponseCache()
+    faas_options = FaaSOptions(
+        execution=execution,
+        compression=compression,
+        compression_threshold=compression_threshold,
+        cache=cache or None,
+        deduplicate=deduplicate,
+        batch_size=batch_size,
+        max_wait_ms=max_wait_ms,
+    )
+    for sz in (req_sz, resp_sz):
+        SerializerRegistry.name_of(sz)
 
     def exec_wrapper(
         func,
     ) -> Callable[[bytes, BasicProperties], ProxyResponse]:
-        def _exec(
-            msg_bytes_en: bytes, pika_props: BasicProperties
-        ) -> ProxyResponse:
-            msg_bytes = BytesEncoder.decode(msg_bytes_en)
-            required_en = req_codec or req_sz.ENCODING
-            if req_sz is not BinarySerializer:
-                try:
-                    msg_str = StringEncoder.decode(
-                        msg_bytes, codec=required_en
-                    )
-                except Exception:
-                    # TODO: return proper status 40X and message
-                    #  (don't raise an Exception)
-                    raise Exception(
-                        "ContentDecodingError: an error occurred while "
-                        f"trying to decode {msg_bytes} "
-                        f"into '{required_en}'"
-                    )
-
-                try:
-                    object_ = req_sz.deserialize(msg_str)
-                except Exception:
-                    # TODO: return proper status 40X and message
-                    #  (don't raise an Exception)
-                    raise Exception(
-                        "DeserializationError: an error occurred while "
-                        "deserializing message {0} with {1}".format(
-                            msg_str, req_sz
-                        )
-                    )
-            else:
-                object_ = pickle.loads(msg_bytes)
-                msg_bytes = object_
+        _check_faas_options(func, faas_options)
+        if batch_size:
+
+            def _exec(
+                messages: List[Tuple[bytes, BasicProperties]]
+            ) -> List[ProxyResponse]:
+                return _exec_batch(
+                    func,
+                    messages,
+                    req_sz,
+                    resp_sz,
+                    req_codec,
+                    resp_codec,
+                    faas_options,
+                )
 
-            x_request = ProxyRequest(object_=object_, app_id=pika_props.app_id)
+        elif asyncio.iscoroutinefunction(func):
 
-            x_request.set_properties(
-                bytes_=msg_bytes,
-                encoding=required_en,
-                content_type=req_sz.CONTENT_TYPE,
-                message_headers=pika_props.headers,
-            )
+            async def _exec(
+                msg_bytes_en: bytes, pika_props: BasicProperties
+            ) -> ProxyResponse:
+                key, x_response = _cached_response(
+                    cache, msg_bytes_en, pika_props
+                )
+                if x_response is not None:
+                    return x_response
+                x_request = _decode_request(
+                    req_sz, req_codec, msg_bytes_en, pika_props
+                )
+                x_response = await func(x_request)
+                return _cache_response(
+                    cache,
+                    key,
+                    _encode_response(
+                        resp_sz,
+                        resp_codec,
+                        x_response,
+                        pika_props,
+                        faas_options,
+                    ),
+                )
 
-            x_response = func(x_request)
-
-            response_encoding = resp_codec or resp_sz.ENCODING
-            if resp_sz is not BinarySerializer:
-                resp_str = None
-                try:
-                    resp_str = resp_sz.serialize(x_response.object)
-                except Exception as err:
-                    x_response.status = 500
-                    x_response.error_message = (
-                        "SerializationError: "
-                        "an error occurred while serializing object "
-                        "{0} with {1}\n\n*** error_desc ***\n{2}".format(
-                            x_response.object, resp_sz, err
-                        )
-                    )
-
-                resp_bytes = None
-                try:
-                    if resp_str:
-                        resp_bytes = StringEncoder.encode(
-                            resp_str, codec=response_encoding
-                        )
-                except Exception as err:
-                    x_response.status = 500
-                    x_response.error_message = (
-                        "ContentEncodingError: "
-                        f"an error occurred while trying to encode {resp_str} "
-                        f"into '{response_encoding}'"
-                        f"\n*** error_desc ***\n{err}"
-                    )
-            else:
-                resp_bytes = pickle.dumps(x_response.object)
+        elif inspect.isgeneratorfunction(func):
 
-            if x_response.is_error:
-                resp_ct = TextSerializer.CONTENT_TYPE
-                response_encoding = TextSerializer.ENCODING
-                resp_bytes = StringEncoder.encode(
-                    x_response.error_message, codec=response_encoding
+            def _exec(
+                msg_bytes_en: bytes, pika_props: BasicProperties
+            ) -> Iterator[ProxyResponse]:
+                x_request = _decode_request(
+                    req_sz, req_codec, msg_bytes_en, pika_props
+                )
+                return _stream_responses(
+                    func(x_request),
+                    resp_sz,
+                    resp_codec,
+                    pika_props,
+                    faas_options,
                 )
-            else:
-                resp_ct = resp_sz.CONTENT_TYPE
-
-            body = BytesEncoder.encode(resp_bytes)
-
-            x_response.set_properties(
-                bytes_=body,
-                encoding=response_encoding,
-                content_type=resp_ct,
-                message_headers={
-                    "Response-Status": x_response.status_code,
-                    "Response-Serializer": resp_sz.__name__,
-                },
-            )
 
-            return x_response
+        else:
 
+            def _exec(
+                msg_bytes_en: bytes, pika_props: BasicProperties
+            ) -> ProxyResponse:
+                key, x_response = _cached_response(
+                    cache, msg_bytes_en, pika_props
+                )
+                if x_response is not None:
+                    return x_response
+                x_request = _decode_request(
+                    req_sz, req_codec, msg_bytes_en, pika_props
+                )
+                x_response = func(x_request)
+                return _cache_response(
+                    cache,
+                    key,
+                    _encode_response(
+                        resp_sz,
+                        resp_codec,
+                        x_response,
+                        pika_props,
+                        faas_options,
+                    ),
+                )
+
+        _exec.faas_options = faas_options
         return _exec
 
     return exec_wrapper
 
 
+def _check_faas_options(func, faas_options: FaaSOptions):
+    """Rejects the options that do not apply to the kind of function."""
+    is_coroutine = asyncio.iscoroutinefunction(func)
+    is_generator = inspect.isgeneratorfunction(func)
+    execution = faas_options.execution
+    # only plain functions run on the process pool, and batches
+    # are run by the consumer on its worker threads
+    if execution == FaaSOptions.EXECUTION_PROCESS and (
+        is_coroutine or is_generator or faas_options.batch_size
+    ):
+        raise InvalidFaaSOptionError(
+            "execution", execution, (FaaSOptions.EXECUTION_THREAD,)
+        )
+    if faas_options.batch_size and (is_coroutine or is_generator):
+        raise InvalidFaaSOptionError(
+            "batch_size", faas_options.batch_size, ("None",)
+        )
+    # streamed responses are neither cached nor shared
+    if is_generator and faas_options.cache:
+        raise InvalidFaaSOptionError("cache", faas_options.cache, ("None",))
+    if is_generator and faas_options.deduplicate:
+        raise InvalidFaaSOptionError(
+            "deduplicate", faas_options.deduplicate, ("False",)
+        )
+
+
+def _exec_batch(
+    func: Callable[[List[ProxyRequest]], List[ProxyResponse]],
+    messages: List[Tuple[bytes, BasicProperties]],
+    req_sz: Type[BaseSerializer],
+    resp_sz: Type[BaseSerializer],
+    req_codec: str,
+    resp_codec: str,
+    faas_options: FaaSOptions,
+) -> List[ProxyResponse]:
+    """
+    Calls a batch FaaS with the requests of the messages that are
+    neither cached nor malformed, the other ones get their cached
+    or error response.
+    """
+    cache = faas_options.cache
+    x_responses = [None] * len(messages)
+    keys = [None] * len(messages)
+    batch, x_requests = [], []
+    for i, (msg_bytes_en, pika_props) in enumerate(messages):
+        keys[i], x_responses[i] = _cached_response(
+            cache, msg_bytes_en, pika_props
+        )
+        if x_responses[i] is not None:
+            continue
+        try:
+            x_requests.append(
+                _decode_request(req_sz, req_codec, msg_bytes_en, pika_props)
+            )
+            batch.append(i)
+        except Exception as err:
+            x_responses[i] = _request_error(err, pika_props)
+
+    results = list(func(x_requests)) if x_requests else []
+    if len(results) != len(x_requests):
+        error_message = (
+            "[ServerError] The batch FaaS returned "
+            f"{len(results)} responses for {len(x_requests)} requests"
+        )
+        results = [
+            ProxyResponse(500, error_message=error_message) for _ in batch
+        ]
+
+    for i, x_response in zip(batch, results):
+        pika_props = messages[i][1]
+        x_responses[i] = _cache_response(
+            cache,
+            keys[i],
+            _encode_response(
+                resp_sz, resp_codec, x_response, pika_props, faas_options
+            ),
+        )
+    return x_responses
+
+
+def _cached_response(
+    cache: Optional[ResponseCache], msg_bytes_en, pika_props: BasicProperties
+) -> Tuple[Optional[bytes], Optional[ProxyResponse]]:
+    """The cache key of the request and its cached response, if any."""
+    if not cache:
+        return None, None
+    key = cache.key(msg_bytes_en, pika_props.headers)
+    if key is None:
+        return None, None
+    return key, cache.get(key)
+
+
+def _cache_response(
+    cache: Optional[ResponseCache], key: Optional[bytes], x_response
+) -> ProxyResponse:
+    if key is not None:
+        cache.put(key, x_response)
+    return x_response
+
+
+def _decode_request(
+    req_sz: Type[BaseSerializer],
+    req_codec: str,
+    msg_bytes_en: bytes,
+    pika_props: BasicProperties,
+) -> ProxyRequest:
+    compression = CompressionEncoder.codec_of(pika_props.headers)
+    if ChunkAssembler.is_chunked(pika_props.headers):
+        # chunks are decoded while the body is reassembled
+        msg_bytes = msg_bytes_en
+        if is_stream(msg_bytes) and (
+            compression or not issubclass(req_sz, StreamSerializer)
+        ):
+            msg_bytes = msg_bytes.read()
+    else:
+        msg_bytes = BytesEncoder.decode(
+            msg_bytes_en, BytesEncoder.codec_of(pika_props.headers)
+        )
+    msg_bytes = CompressionEncoder.decompress(msg_bytes, compression)
+    required_en = req_codec or req_sz.ENCODING
+    if issubclass(req_sz, BaseBinarySerializer):
+        try:
+            object_ = req_sz.deserialize(msg_bytes, pika_props.headers)
+        except Exception:
+            raise Exception(
+                "DeserializationError: an error occurred while "
+                "deserializing message {0} with {1}".format(msg_bytes, req_sz)
+            )
+    elif req_sz is not BinarySerializer:
+        try:
+            msg_str = StringEncoder.decode(msg_bytes, codec=required_en)
+        except Exception:
+            # TODO: return proper status 40X and message
+            #  (don't raise an Exception)
+            raise Exception(
+                "ContentDecodingError: an error occurred while "
+                f"trying to decode {msg_bytes} "
+                f"into '{required_en}'"
+            )
+
+        try:
+            object_ = req_sz.deserialize(msg_str)
+        except Exception:
+            # TODO: return proper status 40X and message
+            #  (don't raise an Exception)
+            raise Exception(
+                "DeserializationError: an error occurred while "
+                "deserializing message {0} with {1}".format(msg_str, req_sz)
+            )
+    else:
+        object_ = pickle.loads(msg_bytes)
+        msg_bytes = object_
+
+    x_request = ProxyRequest(object_=object_, app_id=pika_props.app_id)
+
+    x_request.set_properties(
+        bytes_=msg_bytes,
+        encoding=required_en,
+        content_type=req_sz.CONTENT_TYPE,
+        message_headers=pika_props.headers,
+    )
+
+    return x_request
+
+
+def _encode_response(
+    resp_sz: Type[BaseSerializer],
+    resp_codec: str,
+    x_response: ProxyResponse,
+    pika_props: BasicProperties,
+    faas_options: FaaSOptions,
+) -> ProxyResponse:
+    # the response has the same binary codec than the request
+    binary_codec = BytesEncoder.codec_of(pika_props.headers)
+    response_encoding = resp_codec or resp_sz.ENCODING
+    sz_headers = dict()
+    if resp_sz is not BinarySerializer:
+        resp_str = None
+        try:
+            resp_str = resp_sz.serialize(x_response.object)
+        except Exception as err:
+            x_response.status = 500
+            x_response.error_message = (
+                "SerializationError: "
+                "an error occurred while serializing object "
+                "{0} with {1}\n\n*** error_desc ***\n{2}".format(
+                    x_response.object, resp_sz, err
+                )
+            )
+
+        resp_bytes = None
+        try:
+            if issubclass(resp_sz, BaseBinarySerializer):
+                resp_bytes = resp_str
+                if is_stream(resp_bytes):
+                    resp_bytes = resp_bytes.read()
+                sz_headers = resp_sz.headers(x_response.object)
+            elif resp_str:
+                resp_bytes = StringEncoder.encode(
+                    resp_str, codec=response_encoding
+                )
+        except Exception as err:
+            x_response.status = 500
+            x_response.error_message = (
+                "ContentEncodingError: "
+                f"an error occurred while trying to encode {resp_str} "
+                f"into '{response_encoding}'"
+                f"\n*** error_desc ***\n{err}"
+            )
+    else:
+        resp_bytes = pickle.dumps(x_response.object)
+
+    if x_response.is_error:
+        resp_ct = TextSerializer.CONTENT_TYPE
+        response_encoding = TextSerializer.ENCODING
+        resp_bytes = StringEncoder.encode(
+            x_response.error_message, codec=response_encoding
+        )
+    else:
+        resp_ct = resp_sz.CONTENT_TYPE
+
+    headers = {
+        "Response-Status": x_response.status_code,
+        "Response-Serializer": SerializerRegistry.name_of(resp_sz),
+        BytesEncoder.HEADER: binary_codec,
+    }
+    if not x_response.is_error:
+        headers.update(sz_headers)
+    resp_bytes, compression = CompressionEncoder.compress(
+        resp_bytes,
+        faas_options.compression,
+        faas_options.compression_threshold,
+    )
+    if compression:
+        headers[CompressionEncoder.HEADER] = compression
+    body = BytesEncoder.encode(resp_bytes, binary_codec)
+
+    x_response.set_properties(
+        bytes_=body,
+        encoding=response_encoding,
+        content_type=resp_ct,
+        message_headers=headers,
+    )
+
+    return x_response
+
+
+def _stream_responses(
+    results: Iterator,
+    resp_sz: Type[BaseSerializer],
+    resp_codec: str,
+    pika_props: BasicProperties,
+    faas_options: FaaSOptions,
+) -> Iterator[ProxyResponse]:
+    """Encodes the partial results of a generator FaaS as they come."""
+    seq = 0
+    try:
+        for result in results:
+            if not isinstance(result, ProxyResponse):
+                result = ProxyResponse(200, object_=result)
+            x_response = _encode_response(
+                resp_sz, resp_codec, result, pika_props, faas_options
+            )
+            x_response.add_headers({ResponseStream.SEQ_HEADER: seq})
+            yield x_response
+            seq += 1
+        end = ProxyResponse(200)
+    except Exception as err:
+        end = ProxyResponse(
+            500,
+            error_message="[ServerError] An unexpected error occurred "
+            "while streaming the response: "
+            f"'{err.__class__.__name__} -> {err}'",
+        )
+
+    end = _text_response(end, pika_props)
+    end.add_headers(
+        {ResponseStream.SEQ_HEADER: seq, ResponseStream.END_HEADER: True}
+    )
+    yield end
+
+
+def _request_error(err, pika_props: BasicProperties) -> ProxyResponse:
+    """The response of a request that cannot be decoded."""
+    return _text_response(
+        ProxyResponse(400, error_message=f"[RequestError] {err}"), pika_props
+    )
+
+
+def _text_response(
+    x_response: ProxyResponse, pika_props: BasicProperties
+) -> ProxyResponse:
+    """Encodes a response without result, but its error message if any."""
+    binary_codec = BytesEncoder.codec_of(pika_props.headers)
+    body = b""
+    if x_response.is_error:
+        body = BytesEncoder.encode(
+            StringEncoder.encode(x_response.error_message), binary_codec
+        )
+    x_response.set_properties(
+        bytes_=body,
+        encoding=TextSerializer.ENCODING,
+        content_type=TextSerializer.CONTENT_TYPE,
+        message_headers={
+            "Response-Status": x_response.status_code,
+            "Response-Serializer": SerializerRegistry.name_of(TextSerializer),
+            BytesEncoder.HEADER: binary_codec,
+        },
+    )
+    return x_response
+
+
 def faas_producer(
-    con: ClientConnector, faas_name: str, req_sz: Type[BaseSerializer]
+    con: ClientConnector,
+    faas_name: str,
+    req_sz: Type[BaseSerializer],
+    compression: str = None,
+    compression_threshold: int = 1024,
+    chunk_size: int = None,
+    cache: ClientCache = None,
+    coalesce: bool = False,
 ) -> Callable:
     """
     Decorator that implements an interface,
@@ -168,52 +547,256 @@ def faas_producer(
     :param faas_name: the name of the RPC FaaS function
         that will be invoked.
     :param req_sz: the request serializer type.
+    :param compression: the request compression codec (zlib, bz2 or lzma),
+        requests are not compressed if not provided.
+    :param compression_threshold: the minimum request size in bytes
+        to be compressed.
+    :param chunk_size: requests larger than it (in bytes) are sent
+        as a sequence of chunk messages of this size, binary file
+        objects (see StreamSerializer) are read chunk by chunk,
+        and so they are not compressed.
+        Requests are sent as a single message if not provided.
+    :param cache: the ClientCache of the responses, repeated requests
+        are answered from it without publishing them.
+    :param coalesce: identical requests (same FaaS and serialized
+        request) made while one of them is in flight wait for its
+        response instead of being published (see RequestCoalescer).
     :return: The function wrapper that calls the decorated function
         passing trough a Producer publish call returning a ProxyResponse.
+        It also has a map method for bulk calls: map(items) calls the
+        decorated function with each item, keeping up to max_in_flight
+        requests published at once, and yields their ProxyResponse
+        in the items order (or as they complete if ordered is False).
+        And a stream method for generator FaaS, that yields the
+        ProxyResponse of each partial result as soon as it arrives.
     """
 
+    faas_options = FaaSOptions(
+        compression=compression,
+        compression_threshold=compression_threshold,
+        chunk_size=chunk_size,
+    )
+    coalescer = RequestCoalescer() if coalesce else None
+
     def publish_wrapper(func) -> Callable[..., ProxyResponse]:
-        @connection_is_open(con)
-        def _publish(*args, **kwargs) -> ProxyResponse:
+        def _request(*args, **kwargs) -> ProxyRequest:
             x_request = func(*args, **kwargs)
-            x_request.app_id = con.config.producer_application_id or "Unknown"
-            x_request.add_headers({"FaaS-Name": faas_name})
-
-            if req_sz is not BinarySerializer:
-                try:
-                    req_str = req_sz.serialize(x_request.object)
-                    req_bytes = StringEncoder.encode(
-                        req_str, codec=req_sz.ENCODING
-                    )
-                except Exception as err:
-                    raise SerializationError(x_request.object, req_sz, err)
-            else:
-                req_bytes = pickle.dumps(x_request.object)
+            _prepare_request(con, faas_name, req_sz, x_request, faas_options)
+            return x_request
 
-            body = BytesEncoder.encode(req_bytes)
+        def _send(x_request: ProxyRequest) -> ProxyResponse:
+            with con.pool.connection() as pooled:
+                return pooled.producer.publish(x_request)
 
-            x_request.bytes = body
-            x_request.content_type = req_sz.CONTENT_TYPE
-            x_request.encoding = req_sz.ENCODING
-
-            producer = _new_producer(con)
-            x_response = producer.publish(x_request)
+        @connection_is_open(con)
+        def _publish(*args, **kwargs) -> ProxyResponse:
+            x_request = _request(*args, **kwargs)
+            key = request_key(faas_name, x_request)
+            if key is None:
+                return _send(x_request)
+
+            load = functools.partial(_send, x_request)
+            if coalescer:
+                load = functools.partial(coalescer.call, key, load)
+            if cache:
+                return cache.fetch(key, load)
+            return load()
 
-            return x_response
+        @connection_is_open(con)
+        def _map(
+            items: Iterable,
+            max_in_flight: int = 100,
+            ordered: bool = True,
+            timeout: float = None,
+        ) -> Iterator[ProxyResponse]:
+            with con.pool.connection() as pooled:
+                yield from _publish_many(
+                    pooled.producer,
+                    map(_request, items),
+                    max_in_flight,
+                    ordered,
+                    timeout,
+                )
 
+        @connection_is_open(con)
+        def _stream(
+            *args, timeout: float = None, **kwargs
+        ) -> Iterator[ProxyResponse]:
+            x_request = _request(*args, **kwargs)
+            with con.pool.connection() as pooled:
+                yield from pooled.producer.publish_stream(x_request, timeout)
+
+        _publish.map = _map
+        _publish.stream = _stream
         return _publish
 
     return publish_wrapper
 
 
-def _new_producer(connector):
-    def _get():
-        return Producer(connector.bck_con, connector.config.amqp_entities)
+def async_faas_producer(
+    con: AsyncClientConnector,
+    faas_name: str,
+    req_sz: Type[BaseSerializer],
+    compression: str = None,
+    compression_threshold: int = 1024,
+    chunk_size: int = None,
+    cache: ClientCache = None,
+    coalesce: bool = False,
+) -> Callable:
+    """
+    Decorator like faas_producer for asyncio applications,
+    the decorated function (that can also be a coroutine function)
+    returns a ProxyRequest object and calling it returns an awaitable
+    of the ProxyResponse.
+    Concurrent calls made from the same event loop share its connection.
 
-    try:
-        producer = _get()
-    except StreamLostError:
-        connector.reload()
-        producer = _get()
+    :param con: the asyncio client connector (AsyncClientConnector).
+    :param faas_name: the name of the RPC FaaS function
+        that will be invoked.
+    :param req_sz: the request serializer type.
+    :param compression: the request compression codec (zlib, bz2 or lzma).
+    :param compression_threshold: the minimum request size in bytes
+        to be compressed.
+    :param chunk_size: the size in bytes of the chunk messages
+        of larger requests.
+    :param cache: the ClientCache of the responses.
+    :param coalesce: collapse identical requests in flight.
+    :return: The coroutine function that calls the decorated function
+        passing trough an AsyncProducer publish call returning
+        a ProxyResponse. Its stream method is the asynchronous generator
+        of the partial results of a generator FaaS.
+    """
+
+    faas_options = FaaSOptions(
+        compression=compression,
+        compression_threshold=compression_threshold,
+        chunk_size=chunk_size,
+    )
+    coalescer = RequestCoalescer() if coalesce else None
 
-    return producer
+    def publish_wrapper(func) -> Callable[..., Awaitable[ProxyResponse]]:
+        async def _request(*args, **kwargs) -> ProxyRequest:
+            x_request = func(*args, **kwargs)
+            if asyncio.iscoroutine(x_request):
+                x_request = await x_request
+            _prepare_request(con, faas_name, req_sz, x_request, faas_options)
+            return x_request
+
+        async def _send(x_request: ProxyRequest) -> ProxyResponse:
+            producer = await con.get_producer()
+            return await producer.publish(x_request)
+
+        async def _publish(*args, **kwargs) -> ProxyResponse:
+            x_request = await _request(*args, **kwargs)
+            key = request_key(faas_name, x_request)
+            if key is None:
+                return await _send(x_request)
+
+            load = functools.partial(_send, x_request)
+            if coalescer:
+                load = functools.partial(coalescer.call_async, key, load)
+            if cache:
+                return await cache.fetch_async(key, load)
+            return await load()
+
+        async def _stream(
+            *args, timeout: float = None, **kwargs
+        ) -> AsyncIterator[ProxyResponse]:
+            x_request = await _request(*args, **kwargs)
+            producer = await con.get_producer()
+            async for x_response in producer.publish_stream(
+                x_request, timeout
+            ):
+                yield x_response
+
+        _publish.stream = _stream
+        return _publish
+
+    return publish_wrapper
+
+
+def _publish_many(
+    producer: Producer,
+    requests: Iterator[ProxyRequest],
+    max_in_flight: int,
+    ordered: bool,
+    timeout: float,
+) -> Iterator[ProxyResponse]:
+    in_flight = deque()
+    completed = deque()
+
+    def fill():
+        for x_request in islice(requests, max_in_flight - len(in_flight)):
+            future = producer.publish_async(x_request)
+            if not ordered:
+                future.add_done_callback(completed.append)
+            in_flight.append(future)
+
+    fill()
+    while in_flight:
+        if ordered:
+            future = in_flight.popleft()
+        else:
+            if not completed and not producer.wait_any(in_flight, timeout):
+                # the oldest request expires raising ResponseTimeoutError
+                in_flight[0].result(0)
+            future = completed.popleft()
+            in_flight.remove(future)
+        yield future.result(timeout)
+        fill()
+
+
+def _prepare_request(
+    con,
+    faas_name,
+    req_sz,
+    x_request: ProxyRequest,
+    faas_options: FaaSOptions = None,
+):
+    faas_options = faas_options or FaaSOptions()
+    binary_codec = con.config.options.binary_codec
+    x_request.app_id = con.config.producer_application_id or "Unknown"
+    x_request.add_headers({"FaaS-Name": faas_name})
+    if binary_codec != BytesEncoder.BINARY_CODECS[0]:
+        # peers without the header expect the base64 codec
+        x_request.add_headers({BytesEncoder.HEADER: binary_codec})
+
+    if req_sz is not BinarySerializer:
+        try:
+            req_str = req_sz.serialize(x_request.object)
+            if issubclass(req_sz, BaseBinarySerializer):
+                req_bytes = req_str
+                x_request.add_headers(req_sz.headers(x_request.object))
+            else:
+                req_bytes = StringEncoder.encode(
+                    req_str, codec=req_sz.ENCODING
+                )
+        except Exception as err:
+            raise SerializationError(x_request.object, req_sz, err)
+    else:
+        req_bytes = pickle.dumps(x_request.object)
+
+    chunk_size = faas_options.chunk_size
+    if is_stream(req_bytes) and not chunk_size:
+        req_bytes = req_bytes.read()
+    if not is_stream(req_bytes):
+        req_bytes, compression = CompressionEncoder.compress(
+            req_bytes,
+            faas_options.compression,
+            faas_options.compression_threshold,
+        )
+        if compression:
+            x_request.add_headers({CompressionEncoder.HEADER: compression})
+
+    if chunk_size and (
+        is_stream(req_bytes) or memoryview(req_bytes).nbytes > chunk_size
+    ):
+        # the body goes in the chunk messages, the head one is empty
+        x_request.chunks = iter_chunks(req_bytes, chunk_size, binary_codec)
+        body = b""
+    else:
+        body = BytesEncoder.encode(req_bytes, binary_codec)
+
+    x_request.bytes = body
+    x_request.content_type = req_sz.CONTENT_TYPE
+    x_request.encoding = req_sz.ENCODING
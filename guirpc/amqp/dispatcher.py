@@ -0,0 +1,231 @@
+import functools
+import logging
+from collections import deque
+from threading import Lock
+from typing import Callable, Dict
+
+LOGGER = logging.getLogger("rpcServer")
+
+
+class AckTracker:
+    """
+    Keeps the unacknowledged delivery tags of a channel in delivery order,
+    so that a run of completed tags can be acknowledged at once
+    with a single basic_ack(multiple=True).
+
+    It is not thread-safe, it must only be used from the IO loop.
+    """
+
+    def __init__(self):
+        self._outstanding = deque()
+        # the same tags, for constant time membership checks
+        self._outstanding_tags = set()
+        self._ready = set()
+        self._acked = set()
+
+    def track(self, tag: int):
+        self._outstanding.append(tag)
+        self._outstanding_tags.add(tag)
+
+    def ready(self, tag: int):
+        self._ready.add(tag)
+
+    def pop_prefix(self):
+        """
+        Pops the contiguous run of ready tags from the oldest delivery on.
+
+        :return: the highest ready tag of the prefix or None.
+        """
+        last = None
+        while self._outstanding and (
+            self._outstanding[0] in self._ready
+            or self._outstanding[0] in self._acked
+        ):
+            tag = self._outstanding.popleft()
+            self._outstanding_tags.discard(tag)
+            if tag in self._ready:
+                self._ready.discard(tag)
+                last = tag
+            else:
+                self._acked.discard(tag)
+        return last
+
+    def pop_ready(self):
+        """Pops the remaining ready tags that are not part of the prefix."""
+        tags = sorted(self._ready)
+        self._ready.clear()
+        self._acked.update(t for t in tags if t in self._outstanding_tags)
+        return tags
+
+
+class OutboundDispatcher:
+    """
+    This is a thread-safe hand-off of acks and replies from the worker
+    threads to the connection IO loop, as pika channels must only be
+    used from the thread that runs the IO loop.
+
+    Workers just queue the outbound frames. The first one queued
+    schedules a single flush on the IO loop that drains everything
+    queued until then: replies are published and acks are combined
+    into basic_ack(multiple=True) calls whenever the tags are contiguous.
+    """
+
+    def __init__(
+        self,
+        schedule: Callable[[Callable], None],
+        combine_acks: bool = True,
+        hold_acks: bool = False,
+    ):
+        """
+        :param schedule: thread-safe function that runs a callback
+            on the IO loop (e.g. ioloop.add_callback_threadsafe).
+        :param combine_acks: ack contiguous tags with a multiple ack,
+            otherwise each tag is acked on its own.
+        :param hold_acks: hold the acks of tags completed out of order
+            until every previous delivery is completed too.
+        """
+        self._schedule = schedule
+        self._combine_acks = combine_acks
+        self._hold_acks = hold_acks
+        self._lock = Lock()
+        self._replies = []
+        self._acks = []
+        self._flush_scheduled = False
+        self._trackers: Dict[int, AckTracker] = dict()
+        self._published = 0
+
+    @property
+    def published(self):
+        """Number of replies published so far."""
+        return self._published
+
+    def track(self, channel, delivery_tag: int):
+        """Registers a delivery, it must be called from the IO loop."""
+        self._get_tracker(channel).track(delivery_tag)
+
+    def ack(self, channel, delivery_tag: int):
+        self._enqueue(self._acks, (channel, delivery_tag))
+
+    def publish(self, channel, **publish_kwargs):
+        self._enqueue(self._replies, (channel, publish_kwargs))
+
+    def _enqueue(self, items: list, item):
+        with self._lock:
+            items.append(item)
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._schedule(self.flush)
+
+    def _get_tracker(self, channel) -> AckTracker:
+        number = channel.channel_number
+        if number not in self._trackers:
+            self._trackers[number] = AckTracker()
+        return self._trackers[number]
+
+    def flush(self):
+        """Drains queued replies and acks, it runs on the IO loop."""
+        with self._lock:
+            replies, self._replies = self._replies, []
+            acks, self._acks = self._acks, []
+            self._flush_scheduled = False
+
+        for channel, publish_kwargs in replies:
+            if channel.is_open:
+                channel.basic_publish(**publish_kwargs)
+                self._published += 1
+
+        channels = dict()
+        for channel, tag in acks:
+            self._get_tracker(channel).ready(tag)
+            channels[channel.channel_number] = channel
+
+        ack_frames = 0
+        for number, channel in channels.items():
+            if not channel.is_open:
+                self._trackers.pop(number, None)
+                continue
+            ack_frames += self._flush_acks(channel, self._trackers[number])
+
+        LOGGER.debug(
+            "Flushed %d replies and %d acks in %d ack frames",
+            len(replies),
+            len(acks),
+            ack_frames,
+        )
+
+    def _flush_acks(self, channel, tracker: AckTracker) -> int:
+        ack_frames = 0
+        if self._combine_acks:
+            last_tag = tracker.pop_prefix()
+            if last_tag is not None:
+                channel.basic_ack(last_tag, multiple=True)
+                ack_frames += 1
+            if self._hold_acks:
+                return ack_frames
+        for tag in tracker.pop_ready():
+            channel.basic_ack(tag)
+            ack_frames += 1
+        # drops the leading tags that are already acked
+        tracker.pop_prefix()
+        return ack_frames
+
+
+class RequestBatcher:
+    """
+    Buffers the messages of batch FaaS (see register_faas batch_size)
+    until a batch is completed: once it has batch_size messages,
+    or max_wait_ms after its first message.
+
+    It is not thread-safe, it must only be used from the IO loop.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[str, list], None],
+        call_later: Callable,
+        cancel_call: Callable,
+    ):
+        """
+        :param flush: function that runs a batch of messages of a FaaS.
+        :param call_later: function that schedules a callback
+            on the IO loop after some seconds, returning its handle.
+        :param cancel_call: function that cancels a scheduled callback.
+        """
+        self._flush = flush
+        self._call_later = call_later
+        self._cancel_call = cancel_call
+        self._batches: Dict[str, list] = dict()
+        self._timers = dict()
+
+    @property
+    def pending(self):
+        """Number of buffered messages."""
+        return sum(len(batch) for batch in self._batches.values())
+
+    def add(
+        self, faas_name: str, message, batch_size: int, max_wait_ms: float
+    ):
+        batch = self._batches.setdefault(faas_name, [])
+        batch.append(message)
+        if len(batch) >= batch_size:
+            self.flush(faas_name)
+        elif len(batch) == 1:
+            self._timers[faas_name] = self._call_later(
+                max_wait_ms / 1000, functools.partial(self.flush, faas_name)
+            )
+
+    def flush(self, faas_name: str):
+        timer = self._timers.pop(faas_name, None)
+        if timer is not None:
+            self._cancel_call(timer)
+        batch = self._batches.pop(faas_name, None)
+        if batch:
+            LOGGER.debug(
+                "Flushing a batch of %d %s requests", len(batch), faas_name
+            )
+            self._flush(faas_name, batch)
+
+    def flush_all(self):
+        for faas_name in list(self._batches):
+            self.flush(faas_name)
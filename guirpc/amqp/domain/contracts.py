@@ -1,9 +1,10 @@
 from abc import ABC, abstractmethod
+from concurrent.futures import Future
 from typing import TypeVar, Callable
 
 from .exceptions import OpeningChannelError
 from .mixins import AMQPMixin
-from .objects import ProxyObject
+from .objects import ProxyObject, ServerOptions, WorkerPoolStats
 
 BlockingConnection = TypeVar("BlockingConnection")
 Channel = TypeVar("Channel")
@@ -32,6 +33,8 @@ class ConsumerInterface(AMQPMixin, ABC):
         amqp_url: str,
         max_workers: int = 4,
         prefetch_count: int = 1,
+        ack_mode: str = ServerOptions.ACK_EARLY,
+        channels: int = 1,
         *args,
         **kwargs
     ):
@@ -39,6 +42,8 @@ class ConsumerInterface(AMQPMixin, ABC):
         self._amqp_url = amqp_url
         self._max_workers = max_workers
         self._prefetch_count = prefetch_count
+        self._ack_mode = ack_mode
+        self._channels = channels
 
     @property
     def amqp_url(self):
@@ -52,11 +57,47 @@ class ConsumerInterface(AMQPMixin, ABC):
     def prefetch_count(self):
         return self._prefetch_count
 
+    @property
+    def ack_mode(self):
+        return self._ack_mode
+
+    @property
+    def channels(self):
+        return self._channels
+
     @abstractmethod
     def run(self):
         pass
 
 
+class WorkerPoolInterface(ABC):
+    """
+    Executor contract used by consumers to run incoming messages.
+    Implementations keep a long-lived set of workers and block
+    on submit while all of them are busy.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        self._max_workers = max_workers
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    @abstractmethod
+    def stats(self) -> WorkerPoolStats:
+        pass
+
+    @abstractmethod
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        pass
+
+    @abstractmethod
+    def shutdown(self, wait: bool = True):
+        pass
+
+
 class ProducerInterface(AMQPMixin, ABC):
     __connection: BlockingConnection = None
     __channel: Channel = None
@@ -109,3 +150,28 @@ class BaseSerializer(ABC):
     @abstractmethod
     def deserialize(cls, obj_str: str) -> ProxyObject:
         pass
+
+
+class BaseBinarySerializer(BaseSerializer, ABC):
+    """
+    Serializer contract for binary formats, objects are serialized
+    straight into bytes (so there is no string ENCODING).
+    Metadata needed to deserialize them can be sent in message headers.
+    """
+
+    @classmethod
+    @abstractmethod
+    def serialize(cls, obj: ProxyObject) -> bytes:
+        pass
+
+    @classmethod
+    @abstractmethod
+    def deserialize(
+        cls, obj_bytes: bytes, headers: dict = None
+    ) -> ProxyObject:
+        pass
+
+    @classmethod
+    def headers(cls, obj: ProxyObject) -> dict:
+        """The message headers of a serialized object."""
+        return dict()
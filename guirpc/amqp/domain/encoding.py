@@ -1,4 +1,9 @@
 import base64
+import bz2
+import lzma
+import zlib
+
+from .exceptions import InvalidCompressionCodecError
 
 
 class StringEncoder:
@@ -19,12 +24,21 @@ class BytesEncoder:
     """
     Bytes encoder/decoder.
     This applies binary transformations from a bytes-like object
-    to a bytes mapping with codec base64.
+    to a bytes mapping with codec base64, or passes it through
+    untouched with codec raw (AMQP message bodies are binary-safe).
+
+    The codec of a message is announced in its Binary-Codec header,
+    messages without it are base64 encoded.
     """
 
-    # TODO: Maybe extend this class allowing other type
-    #  of binary transformations.
-    BINARY_CODECS = ("base64",)
+    BINARY_CODECS = ("base64", "raw")
+    HEADER = "Binary-Codec"
+
+    @classmethod
+    def codec_of(cls, headers: dict) -> str:
+        """The binary codec announced in the message headers."""
+        codec = (headers or {}).get(cls.HEADER)
+        return codec if codec in cls.BINARY_CODECS else cls.BINARY_CODECS[0]
 
     @classmethod
     def encode(
@@ -45,3 +59,83 @@ class BytesEncoder:
     @staticmethod
     def dec_base64(bytes_: bytes):
         return base64.decodebytes(bytes_)
+
+    @staticmethod
+    def enc_raw(bytes_: bytes):
+        return bytes_
+
+    @staticmethod
+    def dec_raw(bytes_: bytes):
+        return bytes_
+
+
+class CompressionEncoder:
+    """
+    Bytes compressor/decompressor.
+    This applies a stdlib compression codec (zlib, bz2 or lzma)
+    to message bodies, before their binary codec.
+
+    The codec of a compressed message is announced in its
+    Compression-Codec header, messages without it are not compressed.
+    """
+
+    COMPRESSION_CODECS = ("zlib", "bz2", "lzma")
+    HEADER = "Compression-Codec"
+
+    @classmethod
+    def codec_of(cls, headers: dict):
+        """The compression codec announced in the message headers."""
+        return (headers or {}).get(cls.HEADER)
+
+    @classmethod
+    def compress(
+        cls, stream_bytes: bytes, compression_codec: str, threshold: int = 0
+    ):
+        """
+        :param threshold: bodies smaller than it are not compressed.
+        :return: the (maybe) compressed bytes and the applied codec
+            (None if they were not compressed).
+        """
+        if not compression_codec or len(stream_bytes) < threshold:
+            return stream_bytes, None
+        _compressor = getattr(cls, f"enc_{compression_codec}")
+        return _compressor(stream_bytes), compression_codec
+
+    @classmethod
+    def decompress(cls, bytes_obj: bytes, compression_codec: str) -> bytes:
+        """
+        :raises InvalidCompressionCodecError: if the codec is unknown,
+            as it comes from a message header.
+        """
+        if not compression_codec:
+            return bytes_obj
+        if compression_codec not in cls.COMPRESSION_CODECS:
+            raise InvalidCompressionCodecError(
+                compression_codec, cls.COMPRESSION_CODECS
+            )
+        _decompressor = getattr(cls, f"dec_{compression_codec}")
+        return _decompressor(bytes_obj)
+
+    @staticmethod
+    def enc_zlib(bytes_: bytes):
+        return zlib.compress(bytes_)
+
+    @staticmethod
+    def dec_zlib(bytes_: bytes):
+        return zlib.decompress(bytes_)
+
+    @staticmethod
+    def enc_bz2(bytes_: bytes):
+        return bz2.compress(bytes_)
+
+    @staticmethod
+    def dec_bz2(bytes_: bytes):
+        return bz2.decompress(bytes_)
+
+    @staticmethod
+    def enc_lzma(bytes_: bytes):
+        return lzma.compress(bytes_)
+
+    @staticmethod
+    def dec_lzma(bytes_: bytes):
+        return lzma.decompress(bytes_)
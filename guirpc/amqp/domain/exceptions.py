@@ -3,6 +3,65 @@ class ConsumerConfigurationError(Exception):
         return "An error occurred while trying to read consumer configuration."
 
 
+class InvalidServerOptionError(Exception):
+    def __init__(self, option, value, choices):
+        self.option = option
+        self.value = value
+        self.choices = choices
+
+    def __str__(self):
+        return (
+            f"Invalid value '{self.value}' for server option "
+            f"'{self.option}', valid choices are: {', '.join(self.choices)}"
+        )
+
+
+class InvalidClientOptionError(Exception):
+    def __init__(self, option, value, choices):
+        self.option = option
+        self.value = value
+        self.choices = choices
+
+    def __str__(self):
+        return (
+            f"Invalid value '{self.value}' for client option "
+            f"'{self.option}', valid choices are: {', '.join(self.choices)}"
+        )
+
+
+class InvalidFaaSOptionError(Exception):
+    def __init__(self, option, value, choices):
+        self.option = option
+        self.value = value
+        self.choices = choices
+
+    def __str__(self):
+        return (
+            f"Invalid value '{self.value}' for FaaS option "
+            f"'{self.option}', valid choices are: {', '.join(self.choices)}"
+        )
+
+
+class InvalidCompressionCodecError(Exception):
+    def __init__(self, codec, choices):
+        self.codec = codec
+        self.choices = choices
+
+    def __str__(self):
+        return (
+            f"Invalid Compression-Codec '{self.codec}', "
+            f"valid choices are: {', '.join(self.choices)}"
+        )
+
+
+class SerializerNotRegisteredError(Exception):
+    def __init__(self, key):
+        self.key = key
+
+    def __str__(self):
+        return f"There is no serializer registered as '{self.key}'."
+
+
 class AMQPConnectionURINotSetError(Exception):
     def __str__(self):
         return "The AMQP_URI environment variable is not set."
@@ -40,6 +99,47 @@ class OpeningChannelError(Exception):
         )
 
 
+class ResponseTimeoutError(Exception):
+    def __init__(self, corr_id, timeout):
+        self.corr_id = corr_id
+        self.timeout = timeout
+
+    def __str__(self):
+        return (
+            f"No response received for request '{self.corr_id}' "
+            f"after {self.timeout} seconds."
+        )
+
+
+class ConnectionPoolTimeoutError(Exception):
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+
+    def __str__(self):
+        return (
+            f"No connection of the pool ({self.max_size}) "
+            f"was released after {self.timeout} seconds."
+        )
+
+
+class ConnectionPoolClosedError(Exception):
+    def __str__(self):
+        return "The connection pool is closed."
+
+
+class ChunkSequenceError(Exception):
+    def __init__(self, expected, received):
+        self.expected = expected
+        self.received = received
+
+    def __str__(self):
+        return (
+            f"Chunk {self.received} of the request body received "
+            f"while expecting chunk {self.expected}."
+        )
+
+
 class InvalidAMQPConnectionURI(Exception):
     def __init__(self, uri):
         self.uri = uri
@@ -1,7 +1,14 @@
 import os
 from typing import Any
 
-from .exceptions import AMQPConnectionURINotSetError, InvalidAMQPConnectionURI
+from .encoding import BytesEncoder, CompressionEncoder
+from .exceptions import (
+    AMQPConnectionURINotSetError,
+    InvalidAMQPConnectionURI,
+    InvalidClientOptionError,
+    InvalidFaaSOptionError,
+    InvalidServerOptionError,
+)
 from .mixins import MessagePropertiesMixin
 
 
@@ -77,9 +84,47 @@ class AMQPEntities:
 
 
 class ServerOptions:
-    def __init__(self, max_workers: int = 4, prefetch_count: int = 1):
+    # early: acks on receipt, before the FaaS runs.
+    # late: acks each message once its reply is published.
+    # late_batched: like late, but only acks the contiguous run of
+    #   completed deliveries with a single multiple ack.
+    ACK_EARLY = "early"
+    ACK_LATE = "late"
+    ACK_LATE_BATCHED = "late_batched"
+    ACK_MODES = (ACK_EARLY, ACK_LATE, ACK_LATE_BATCHED)
+    # thread: runs every message on the worker pool.
+    # asyncio: runs every message as a task of one event loop,
+    #   up to 'concurrency' at the same time.
+    ENGINE_THREAD = "thread"
+    ENGINE_ASYNCIO = "asyncio"
+    ENGINES = (ENGINE_THREAD, ENGINE_ASYNCIO)
+
+    def __init__(
+        self,
+        max_workers: int = 4,
+        prefetch_count: int = 1,
+        ack_mode: str = ACK_EARLY,
+        engine: str = ENGINE_THREAD,
+        concurrency: int = 100,
+        process_workers: int = 0,
+        channels: int = 1,
+    ):
+        if ack_mode not in self.ACK_MODES:
+            raise InvalidServerOptionError(
+                "ack_mode", ack_mode, self.ACK_MODES
+            )
+        if engine not in self.ENGINES:
+            raise InvalidServerOptionError("engine", engine, self.ENGINES)
         self.max_workers = max_workers
         self.prefetch_count = prefetch_count
+        self.ack_mode = ack_mode
+        self.engine = engine
+        self.concurrency = concurrency
+        # 0 sizes the process pool with the number of CPUs
+        self.process_workers = process_workers
+        # consuming channels opened on the connection, each one
+        # with its own prefetch_count
+        self.channels = channels
 
     @classmethod
     def create(cls, object_data: dict):
@@ -92,18 +137,133 @@ class ServerOptions:
         return cls(
             max_workers=int(object_data.get("max_workers", 4)),
             prefetch_count=int(object_data.get("prefetch_count", 1)),
+            ack_mode=object_data.get("ack_mode", cls.ACK_EARLY),
+            engine=object_data.get("engine", cls.ENGINE_THREAD),
+            concurrency=int(object_data.get("concurrency", 100)),
+            process_workers=int(object_data.get("process_workers", 0)),
+            channels=int(object_data.get("channels", 1)),
         )
 
     @property
     def as_dict(self):
         return dict(
-            max_workers=self.max_workers, prefetch_count=self.prefetch_count
+            max_workers=self.max_workers,
+            prefetch_count=self.prefetch_count,
+            ack_mode=self.ack_mode,
+            engine=self.engine,
+            concurrency=self.concurrency,
+            process_workers=self.process_workers,
+            channels=self.channels,
+        )
+
+
+class FaaSOptions:
+    # thread: runs on the consumer worker threads (or its event loop).
+    # process: runs on a pool of child processes, for CPU-bound FaaS.
+    EXECUTION_THREAD = "thread"
+    EXECUTION_PROCESS = "process"
+    EXECUTION_MODES = (EXECUTION_THREAD, EXECUTION_PROCESS)
+
+    def __init__(
+        self,
+        execution: str = EXECUTION_THREAD,
+        compression: str = None,
+        compression_threshold: int = 1024,
+        chunk_size: int = None,
+        cache=None,
+        deduplicate: bool = False,
+        batch_size: int = None,
+        max_wait_ms: float = 10.0,
+    ):
+        if execution not in self.EXECUTION_MODES:
+            raise InvalidFaaSOptionError(
+                "execution", execution, self.EXECUTION_MODES
+            )
+        if compression and (
+            compression not in CompressionEncoder.COMPRESSION_CODECS
+        ):
+            raise InvalidFaaSOptionError(
+                "compression",
+                compression,
+                CompressionEncoder.COMPRESSION_CODECS,
+            )
+        if batch_size is not None and batch_size <= 0:
+            raise InvalidFaaSOptionError(
+                "batch_size", batch_size, ("a positive number of requests",)
+            )
+        if chunk_size is not None and chunk_size <= 0:
+            raise InvalidFaaSOptionError(
+                "chunk_size", chunk_size, ("a positive number of bytes",)
+            )
+        self.execution = execution
+        # compression codec of the messages sent by the FaaS,
+        # applied to bodies of compression_threshold bytes or more
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        # request bodies larger than chunk_size bytes (or binary file
+        # objects) are sent as a sequence of chunk messages
+        self.chunk_size = chunk_size
+        # ResponseCache of the encoded responses of the FaaS
+        self.cache = cache
+        # identical requests received while one is being executed
+        # are answered with its response, without executing them
+        self.deduplicate = deduplicate
+        # the FaaS is called with a list of up to batch_size requests,
+        # waiting up to max_wait_ms for a batch to be completed
+        self.batch_size = batch_size
+        self.max_wait_ms = max_wait_ms
+
+    @classmethod
+    def of(cls, faas):
+        """
+        Gets the options of a registered FaaS callable.
+
+        :rtype: FaaSOptions
+        """
+        return getattr(faas, "faas_options", None) or cls()
+
+    @property
+    def as_dict(self):
+        return dict(
+            execution=self.execution,
+            compression=self.compression,
+            compression_threshold=self.compression_threshold,
+            chunk_size=self.chunk_size,
+            cache=self.cache.stats.as_dict if self.cache else None,
+            deduplicate=self.deduplicate,
+            batch_size=self.batch_size,
+            max_wait_ms=self.max_wait_ms,
         )
 
 
 class ClientOptions:
-    def __init__(self, response_consumer: str = ""):
+    # RabbitMQ pseudo-queue to receive responses without a reply queue
+    DIRECT_REPLY_TO = "amq.rabbitmq.reply-to"
+
+    def __init__(
+        self,
+        response_consumer: str = "",
+        pool_size: int = 4,
+        pool_prewarm: int = 1,
+        pool_idle_timeout: float = 300.0,
+        binary_codec: str = BytesEncoder.BINARY_CODECS[0],
+    ):
+        if binary_codec not in BytesEncoder.BINARY_CODECS:
+            raise InvalidClientOptionError(
+                "binary_codec", binary_codec, BytesEncoder.BINARY_CODECS
+            )
         self.response_consumer = response_consumer
+        # connections pool: max size, connections opened beforehand
+        # (kept open when idle) and seconds to close an idle connection
+        self.pool_size = pool_size
+        self.pool_prewarm = pool_prewarm
+        self.pool_idle_timeout = pool_idle_timeout
+        # binary codec of request bodies, raw skips the base64 encoding
+        self.binary_codec = binary_codec
+
+    @property
+    def direct_reply_to(self):
+        return self.response_consumer == self.DIRECT_REPLY_TO
 
     @classmethod
     def create(cls, object_data: dict):
@@ -113,11 +273,102 @@ class ClientOptions:
         :param dict object_data: options data.
         :rtype: ClientOptions
         """
-        return cls(response_consumer=object_data.get("response_consumer", ""))
+        return cls(
+            response_consumer=object_data.get("response_consumer", ""),
+            pool_size=int(object_data.get("pool_size", 4)),
+            pool_prewarm=int(object_data.get("pool_prewarm", 1)),
+            pool_idle_timeout=float(
+                object_data.get("pool_idle_timeout", 300.0)
+            ),
+            binary_codec=object_data.get(
+                "binary_codec", BytesEncoder.BINARY_CODECS[0]
+            ),
+        )
+
+    @property
+    def as_dict(self):
+        return dict(
+            response_consumer=self.response_consumer,
+            pool_size=self.pool_size,
+            pool_prewarm=self.pool_prewarm,
+            pool_idle_timeout=self.pool_idle_timeout,
+            binary_codec=self.binary_codec,
+        )
+
+
+class WorkerPoolStats:
+    def __init__(
+        self,
+        max_workers: int,
+        active: int = 0,
+        submitted: int = 0,
+        completed: int = 0,
+        failed: int = 0,
+        busy_time: float = 0.0,
+        uptime: float = 0.0,
+    ):
+        self.max_workers = max_workers
+        self.active = active
+        self.submitted = submitted
+        self.completed = completed
+        self.failed = failed
+        self.busy_time = busy_time
+        self.uptime = uptime
+
+    @property
+    def pending(self):
+        return self.submitted - self.completed - self.active
+
+    @property
+    def utilization(self):
+        """Share of the pool capacity spent running tasks since start."""
+        capacity = self.uptime * self.max_workers
+        return self.busy_time / capacity if capacity else 0.0
 
     @property
     def as_dict(self):
-        return dict(response_consumer=self.response_consumer)
+        return dict(
+            max_workers=self.max_workers,
+            active=self.active,
+            submitted=self.submitted,
+            completed=self.completed,
+            failed=self.failed,
+            pending=self.pending,
+            utilization=round(self.utilization, 4),
+        )
+
+
+class CacheStats:
+    def __init__(
+        self,
+        entries: int = 0,
+        size: int = 0,
+        hits: int = 0,
+        misses: int = 0,
+        evictions: int = 0,
+    ):
+        self.entries = entries
+        # bytes of the cached message bodies
+        self.size = size
+        self.hits = hits
+        self.misses = misses
+        self.evictions = evictions
+
+    @property
+    def hit_ratio(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def as_dict(self):
+        return dict(
+            entries=self.entries,
+            size=self.size,
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+            hit_ratio=round(self.hit_ratio, 4),
+        )
 
 
 class ProxyObject:
@@ -133,6 +384,7 @@ class ProxyRequest(MessagePropertiesMixin, ProxyObject):
     def __init__(self, app_id: str = None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._app_id = app_id
+        self._chunks = None
 
     @property
     def app_id(self):
@@ -142,6 +394,18 @@ class ProxyRequest(MessagePropertiesMixin, ProxyObject):
     def app_id(self, id_):
         self._app_id = id_
 
+    @property
+    def chunks(self):
+        """
+        The (headers, body) chunk messages of a chunked request,
+        that is None if it is sent as a single message.
+        """
+        return self._chunks
+
+    @chunks.setter
+    def chunks(self, chunks):
+        self._chunks = chunks
+
     @classmethod
     def create(
         cls, object_, encoding, content_type, message_headers=None, app_id=None
@@ -0,0 +1,227 @@
+import time
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition
+from typing import Callable, Iterator
+
+from pika.exceptions import AMQPError
+
+from .domain.exceptions import (
+    ConnectionPoolClosedError,
+    ConnectionPoolTimeoutError,
+)
+
+
+class PooledConnection:
+    """
+    This is a BlockingConnection checked out from a ConnectionPool,
+    along with its own producer (created on first use).
+    """
+
+    def __init__(self, connection, producer_factory: Callable):
+        self._connection = connection
+        self._producer_factory = producer_factory
+        self._producer = None
+        self.last_used = time.monotonic()
+
+    @property
+    def connection(self):
+        return self._connection
+
+    @property
+    def producer(self):
+        """
+        :rtype: guirpc.amqp.producer.Producer
+        """
+        if self._producer is None or not self._producer.is_open:
+            self._producer = self._producer_factory(self._connection)
+        return self._producer
+
+    @property
+    def is_open(self):
+        return self._connection.is_open
+
+    def ping(self) -> bool:
+        """Processes pending connection events to find out if it is alive."""
+        if not self.is_open:
+            return False
+        try:
+            self._connection.process_data_events(time_limit=0)
+        except AMQPError:
+            return False
+        return self.is_open
+
+    def close(self):
+        try:
+            if self.is_open:
+                self._connection.close()
+        except AMQPError:
+            pass
+
+
+class ConnectionPool:
+    """
+    This is a thread-safe bounded pool of broker connections.
+
+    A BlockingConnection must only be used by one thread at a time,
+    so each caller checks out its own connection (and producer) and
+    checks it in when done. Up to max_size connections are opened on
+    demand, callers wait for a free one beyond that. Idle connections
+    are health checked on checkout, and the ones unused for idle_timeout
+    seconds are closed, keeping at least min_size of them open.
+    """
+
+    def __init__(
+        self,
+        connect: Callable,
+        producer_factory: Callable,
+        max_size: int = 4,
+        min_size: int = 1,
+        idle_timeout: float = 300.0,
+    ):
+        """
+        :param connect: function that opens a new BlockingConnection.
+        :param producer_factory: function that creates the producer
+            of a connection.
+        """
+        self._connect = connect
+        self._producer_factory = producer_factory
+        self._max_size = max(1, max_size)
+        self._min_size = min(min_size, self._max_size)
+        self._idle_timeout = idle_timeout
+        self._condition = Condition()
+        self._idle = deque()
+        self._size = 0
+        self._closed = False
+
+    @property
+    def max_size(self):
+        return self._max_size
+
+    @property
+    def min_size(self):
+        return self._min_size
+
+    @property
+    def size(self):
+        """Number of open connections, either idle or checked out."""
+        with self._condition:
+            return self._size
+
+    @property
+    def closed(self):
+        return self._closed
+
+    @property
+    def idle(self):
+        with self._condition:
+            return len(self._idle)
+
+    def add(self, connection):
+        """Adds an already open connection to the idle ones."""
+        with self._condition:
+            self._size += 1
+            self._idle.append(
+                PooledConnection(connection, self._producer_factory)
+            )
+            self._condition.notify()
+
+    def prewarm(self):
+        """Opens connections until there are min_size of them."""
+        while self.size < self.min_size:
+            self.add(self._connect())
+
+    def checkout(self, timeout: float = None) -> PooledConnection:
+        """
+        :param timeout: seconds to wait for a free connection,
+            it waits forever if None.
+        :raises ConnectionPoolTimeoutError: if the timeout expires.
+        :raises ConnectionPoolClosedError: if the pool is closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._condition:
+                pooled = self._reserve(deadline, timeout)
+
+            if pooled is None:
+                return self._open()
+            if pooled.ping():
+                return pooled
+            self._discard(pooled)
+
+    def checkin(self, pooled: PooledConnection):
+        pooled.last_used = time.monotonic()
+        if self._closed or not pooled.is_open:
+            self._discard(pooled)
+            return
+
+        with self._condition:
+            self._idle.append(pooled)
+            self._evict_idle()
+            self._condition.notify()
+
+    @contextmanager
+    def connection(self, timeout: float = None) -> Iterator[PooledConnection]:
+        pooled = self.checkout(timeout)
+        try:
+            yield pooled
+        finally:
+            self.checkin(pooled)
+
+    def close(self):
+        """Closes the idle connections, the checked out ones on checkin."""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for pooled in idle:
+            pooled.close()
+
+    def _reserve(self, deadline, timeout):
+        """
+        Pops the most recently used idle connection, or returns None
+        when a new one can be opened, it must be called holding the lock.
+        """
+        while True:
+            if self._closed:
+                raise ConnectionPoolClosedError()
+            self._evict_idle()
+            if self._idle:
+                return self._idle.pop()
+            if self._size < self._max_size:
+                self._size += 1
+                return None
+
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ConnectionPoolTimeoutError(self._max_size, timeout)
+            self._condition.wait(remaining)
+
+    def _open(self) -> PooledConnection:
+        try:
+            return PooledConnection(self._connect(), self._producer_factory)
+        except Exception:
+            with self._condition:
+                self._size -= 1
+                self._condition.notify()
+            raise
+
+    def _discard(self, pooled: PooledConnection):
+        pooled.close()
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def _evict_idle(self):
+        # the least recently used connections are on the left
+        now = time.monotonic()
+        while (
+            self._idle
+            and self._size > self._min_size
+            and now - self._idle[0].last_used > self._idle_timeout
+        ):
+            self._idle.popleft().close()
+            self._size -= 1
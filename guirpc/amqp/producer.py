@@ -1,37 +1,189 @@
+import functools
 import pickle
+import time
+from collections import deque
+from concurrent.futures import Future
+from threading import Condition
+from typing import Callable, Dict, Iterable, Set
 from uuid import uuid4
 
 import pika
 
-from .domain.contracts import ProducerInterface
-from .domain.encoding import BytesEncoder, StringEncoder
-from .domain.objects import ProxyRequest, ProxyResponse
-from .serializers import BinarySerializer, TextSerializer
-from .utils import import_serializer
+from .chunks import ChunkAssembler
+from .domain.contracts import BaseBinarySerializer, ProducerInterface
+from .domain.encoding import BytesEncoder, CompressionEncoder, StringEncoder
+from .domain.exceptions import ResponseTimeoutError
+from .domain.objects import ClientOptions, ProxyRequest, ProxyResponse
+from .serializers import (
+    BinarySerializer,
+    SerializerRegistry,
+    TextSerializer,
+)
+
+
+class ResponseFuture(Future):
+    """
+    This is the future of a published request.
+
+    Responses are only received while the producer connection is
+    processing data events, so waiting on result keeps the connection
+    running (see Producer.wait) instead of just blocking the thread.
+    """
+
+    def __init__(self, producer, corr_id: str):
+        super().__init__()
+        self._producer = producer
+        self._corr_id = corr_id
+
+    @property
+    def corr_id(self):
+        return self._corr_id
+
+    def result(self, timeout: float = None) -> ProxyResponse:
+        self._producer.wait(self, timeout)
+        return super().result(0)
+
+    def exception(self, timeout: float = None):
+        self._producer.wait(self, timeout)
+        return super().exception(0)
+
+
+class ResponseStream:
+    """
+    This is the iterator of a streamed response, made of one response
+    message per partial result of a generator FaaS (with a Stream-Seq
+    header) and a last one with the Stream-End header.
+
+    Like ResponseFuture, iterating it keeps the producer connection
+    processing data events while it waits for the next part.
+    """
+
+    SEQ_HEADER = "Stream-Seq"
+    END_HEADER = "Stream-End"
+
+    def __init__(self, producer, corr_id: str, timeout: float = None):
+        """
+        :param timeout: seconds to wait for each part,
+            it waits forever if None.
+        """
+        self._producer = producer
+        self._corr_id = corr_id
+        self._timeout = timeout
+        self._parts = deque()
+        self._ended = False
+
+    @property
+    def corr_id(self):
+        return self._corr_id
+
+    @classmethod
+    def is_end(cls, props) -> bool:
+        """Whether it is the last message of a response."""
+        headers = props.headers or {}
+        # a plain response is a stream of a single part
+        return bool(headers.get(cls.END_HEADER)) or (
+            cls.SEQ_HEADER not in headers
+        )
+
+    @classmethod
+    def has_result(cls, body, props) -> bool:
+        # the end message of a successful stream is empty, the one
+        # of a failed stream has the error response
+        return bool(body) or not (props.headers or {}).get(cls.END_HEADER)
+
+    def done(self) -> bool:
+        return self._ended
+
+    def put(self, body, props):
+        if self.has_result(body, props):
+            try:
+                self._parts.append(Producer.to_x_response(body, props))
+            except Exception as err:
+                self._parts.append(err)
+        self._ended = self.is_end(props)
+
+    def set_exception(self, err: Exception):
+        self._parts.append(err)
+        self._ended = True
+
+    def has_parts(self) -> bool:
+        return bool(self._parts) or self._ended
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> ProxyResponse:
+        if not self._producer.wait_stream(self, self._timeout):
+            raise ResponseTimeoutError(self._corr_id, self._timeout)
+        if not self._parts:
+            raise StopIteration
+        part = self._parts.popleft()
+        if isinstance(part, Exception):
+            raise part
+        return part
 
 
 class Producer(ProducerInterface):
     """
-    This is a an RPC client/producer that will send requests and block until
-    receiving back a response through a unique channel.
+    This is a an RPC client/producer that sends requests through a unique
+    channel and receives their responses on a single reply queue.
+
+    Requests are matched with their responses by correlation id, so many
+    requests (even from several threads) can be in flight at once
+    sharing the same producer. As a BlockingConnection is not thread-safe,
+    only one thread at a time processes the connection data events,
+    the other ones wait to be notified when their response arrives.
+
+    With direct_reply_to, responses are consumed from the RabbitMQ
+    direct reply-to pseudo-queue, so no reply queue is declared at all.
     """
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, direct_reply_to: bool = False, **kwargs):
         super().__init__(*args, **kwargs)
+        self._direct_reply_to = direct_reply_to
         self._response_queue = None
-        self._corr_id = None
         self._response = None
+        self._pending: Dict[str, ResponseFuture] = dict()
+        self._streams: Dict[str, ResponseStream] = dict()
+        self._condition = Condition()
+        self._pumping = False
         self._set_channel_consume()
 
     @property
     def response(self):
+        """The last received response."""
         return self._response
 
+    @property
+    def response_queue(self):
+        return self._response_queue
+
+    @property
+    def direct_reply_to(self):
+        return self._direct_reply_to
+
+    @property
+    def is_open(self):
+        return self.connection.is_open and self.channel.is_open
+
+    @property
+    def in_flight(self):
+        """Number of published requests waiting for a response."""
+        with self._condition:
+            return len(self._pending)
+
     def _set_channel_consume(self):
-        _dq = self.channel.queue_declare(
-            queue=self.amqp_entities.queue, exclusive=True, auto_delete=True
-        )
-        self._response_queue = _dq.method.queue
+        if self.direct_reply_to:
+            # the pseudo-queue must be consumed (in no-ack mode) before
+            # publishing on the same channel
+            self._response_queue = ClientOptions.DIRECT_REPLY_TO
+        else:
+            _dq = self.channel.queue_declare(
+                queue=self.amqp_entities.queue,
+                exclusive=True,
+                auto_delete=True,
+            )
+            self._response_queue = _dq.method.queue
 
         self.channel.basic_consume(
             queue=self._response_queue,
@@ -40,49 +192,258 @@ class Producer(ProducerInterface):
         )
 
     def _handle_response(self, ch, method, props, body):
-        if self._corr_id == props.correlation_id:
-            self.set_x_response(body, props)
-            self.channel.queue_delete(self._response_queue)
+        with self._condition:
+            stream = self._streams.get(props.correlation_id)
+            if stream is not None and ResponseStream.is_end(props):
+                self._streams.pop(props.correlation_id)
+            future = self._pending.pop(props.correlation_id, None)
+        if stream is not None:
+            stream.put(body, props)
+            with self._condition:
+                self._condition.notify_all()
+            return
+        if future is None or future.done():
+            # response of a request that timed out or was cancelled
+            return
 
-    def publish(self, request: ProxyRequest) -> ProxyResponse:
-        self._response = None
-        self._corr_id = str(uuid4())
-
-        self.channel.basic_publish(
-            exchange=self.amqp_entities.exchange,
-            routing_key=self.amqp_entities.routing_key,
-            properties=pika.BasicProperties(
-                content_type=request.content_type,
-                content_encoding=request.encoding,
-                headers=request.message_headers,
-                reply_to=self._response_queue,
-                correlation_id=self._corr_id,
-                app_id=request.app_id,
-                delivery_mode=2,
-            ),
-            body=request.bytes,
+        try:
+            future.set_result(self.set_x_response(body, props))
+        except Exception as err:
+            future.set_exception(err)
+
+        with self._condition:
+            self._condition.notify_all()
+
+    def publish(
+        self, request: ProxyRequest, timeout: float = None
+    ) -> ProxyResponse:
+        """
+        Publishes the request and blocks until receiving its response.
+
+        :param request: the request to publish.
+        :param timeout: seconds to wait for the response,
+            it waits forever if None.
+        :raises ResponseTimeoutError: if the timeout expires.
+        """
+        return self.publish_async(request).result(timeout)
+
+    def publish_async(self, request: ProxyRequest) -> ResponseFuture:
+        """
+        Publishes the request without waiting for its response.
+
+        :return: the future of the response.
+        """
+        future = ResponseFuture(self, str(uuid4()))
+        with self._condition:
+            self._pending[future.corr_id] = future
+        self._publish(request, future)
+        return future
+
+    def publish_stream(
+        self, request: ProxyRequest, timeout: float = None
+    ) -> ResponseStream:
+        """
+        Publishes the request of a generator FaaS,
+        its partial results are received as they are produced.
+
+        :param timeout: seconds to wait for each partial result,
+            it waits forever if None.
+        :return: the iterator of the partial results (ProxyResponse).
+        """
+        stream = ResponseStream(self, str(uuid4()), timeout)
+        with self._condition:
+            self._streams[stream.corr_id] = stream
+        self._publish(request, stream)
+        return stream
+
+    def _publish(self, request: ProxyRequest, future):
+        with self._condition:
+            publish_now = not self._pumping
+            if publish_now:
+                self._pumping = True
+
+        send = functools.partial(self._send, request, future)
+        if publish_now:
+            try:
+                send()
+            finally:
+                self._release_pump()
+        else:
+            # the connection thread is processing data events,
+            # it publishes the request on its next iteration
+            self.connection.add_callback_threadsafe(send)
+
+    def _send(self, request: ProxyRequest, future):
+        if future.done():
+            return
+        try:
+            headers = request.message_headers
+            if request.chunks is not None:
+                headers = {
+                    **headers,
+                    ChunkAssembler.QUEUE_HEADER: self._declare_chunk_queue(),
+                }
+            self.channel.basic_publish(
+                exchange=self.amqp_entities.exchange,
+                routing_key=self.amqp_entities.routing_key,
+                properties=pika.BasicProperties(
+                    content_type=request.content_type,
+                    content_encoding=request.encoding,
+                    headers=headers,
+                    reply_to=self._response_queue,
+                    correlation_id=future.corr_id,
+                    app_id=request.app_id,
+                    delivery_mode=2,
+                ),
+                body=request.bytes,
+            )
+            if request.chunks is not None:
+                self._send_chunks(
+                    request.chunks,
+                    headers[ChunkAssembler.QUEUE_HEADER],
+                    future.corr_id,
+                )
+        except Exception as err:
+            with self._condition:
+                self._pending.pop(future.corr_id, None)
+                self._streams.pop(future.corr_id, None)
+            if not future.done():
+                future.set_exception(err)
+
+    def _declare_chunk_queue(self) -> str:
+        # not exclusive, as it is consumed by the consumer connection,
+        # it is deleted once consumed or if it is never consumed
+        _dq = self.channel.queue_declare(
+            queue="",
+            auto_delete=True,
+            arguments={"x-expires": ChunkAssembler.QUEUE_EXPIRES},
         )
+        return _dq.method.queue
+
+    def _send_chunks(self, chunks: Iterable, chunk_queue: str, corr_id: str):
+        for headers, body in chunks:
+            self.channel.basic_publish(
+                exchange="",
+                routing_key=chunk_queue,
+                properties=pika.BasicProperties(
+                    headers=headers, correlation_id=corr_id
+                ),
+                body=body,
+            )
+
+    def wait(self, future: ResponseFuture, timeout: float = None):
+        """
+        Waits until the future is done, processing the connection
+        data events unless another thread is already doing it.
+
+        :raises ResponseTimeoutError: if the timeout expires.
+        """
+        if not self._wait_until(future.done, timeout):
+            self._expire(future, timeout)
+
+    def wait_stream(self, stream: ResponseStream, timeout: float = None):
+        """
+        Waits until the stream has a part or it is ended.
+
+        :return: False if the timeout expires, the stream is cancelled.
+        """
+        if self._wait_until(stream.has_parts, timeout):
+            return True
+        with self._condition:
+            self._streams.pop(stream.corr_id, None)
+        return False
+
+    def wait_any(
+        self, futures: Iterable[ResponseFuture], timeout: float = None
+    ) -> Set[ResponseFuture]:
+        """
+        Waits until any of the futures is done.
+
+        :return: the futures that are done,
+            that is empty if the timeout expires.
+        """
+        futures = list(futures)
+
+        def any_done():
+            return any(f.done() for f in futures)
 
-        while not self.response:
-            self.connection.process_data_events()
+        self._wait_until(any_done, timeout)
+        return {f for f in futures if f.done()}
 
-        return self.response
+    def _wait_until(self, is_done: Callable[[], bool], timeout: float):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while not is_done():
+            remaining = None
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
 
-    def set_x_response(self, body, props):
+            with self._condition:
+                if is_done():
+                    break
+                if self._pumping:
+                    self._condition.wait(remaining)
+                    continue
+                self._pumping = True
+
+            try:
+                if not is_done():
+                    self.connection.process_data_events(time_limit=remaining)
+            except Exception as err:
+                self._fail_pending(err)
+                raise
+            finally:
+                self._release_pump()
+        return True
+
+    def _release_pump(self):
+        with self._condition:
+            self._pumping = False
+            self._condition.notify_all()
+
+    def _expire(self, future: ResponseFuture, timeout: float):
+        with self._condition:
+            self._pending.pop(future.corr_id, None)
+        if not future.done():
+            future.set_exception(ResponseTimeoutError(future.corr_id, timeout))
+
+    def _fail_pending(self, err: Exception):
+        with self._condition:
+            pending, self._pending = self._pending, dict()
+            streams, self._streams = self._streams, dict()
+        for future in (*pending.values(), *streams.values()):
+            if not future.done():
+                future.set_exception(err)
+
+    def set_x_response(self, body, props) -> ProxyResponse:
+        self._response = self.to_x_response(body, props)
+        return self._response
+
+    @staticmethod
+    def to_x_response(body, props) -> ProxyResponse:
+        """Decodes a response message into a ProxyResponse."""
         status = props.headers.get("Response-Status")
         sz_name = props.headers.get("Response-Serializer")
 
-        sz = import_serializer(sz_name)
-        decoded_body = BytesEncoder.decode(body)
+        sz = SerializerRegistry.get(sz_name)
+        decoded_body = CompressionEncoder.decompress(
+            BytesEncoder.decode(body, BytesEncoder.codec_of(props.headers)),
+            CompressionEncoder.codec_of(props.headers),
+        )
 
         object_, error_message = (None, None)
+        st_str = str(status)
         if sz is not BinarySerializer:
-            msg_str = StringEncoder.decode(decoded_body, codec=sz.ENCODING)
-
-            st_str = str(status)
             if st_str[:1] in ["5", "4"]:
+                msg_str = StringEncoder.decode(
+                    decoded_body, codec=sz.ENCODING or TextSerializer.ENCODING
+                )
                 error_message = TextSerializer.deserialize(msg_str)
+            elif issubclass(sz, BaseBinarySerializer):
+                object_ = sz.deserialize(decoded_body, props.headers)
             else:
+                msg_str = StringEncoder.decode(decoded_body, codec=sz.ENCODING)
                 object_ = sz.deserialize(msg_str)
         else:
             object_ = pickle.loads(decoded_body)
@@ -95,4 +456,4 @@ class Producer(ProducerInterface):
             message_headers=props.headers,
         )
 
-        self._response = x_resp
+        return x_resp
@@ -1,6 +1,16 @@
+import io
 import json
+import pickle
+import struct
+from typing import Dict, Sequence, Tuple, Type
 
-from .domain.contracts import BaseSerializer
+from .domain.contracts import BaseBinarySerializer, BaseSerializer
+from .domain.exceptions import SerializerNotRegisteredError
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 class JsonSerializer(BaseSerializer):
@@ -45,3 +55,339 @@ class BinarySerializer(BaseSerializer):
     @classmethod
     def deserialize(cls, obj_str):
         pass
+
+
+class StructSerializer(BaseBinarySerializer):
+    """
+    This is a compact binary serializer for fixed-shape records,
+    it packs the values of a record schema (field names and primitive
+    types) with a precompiled struct format.
+
+    Serializers are created (and registered) for each schema with
+    StructSerializer.create, the content type of each one names its
+    schema (e.g. 'application/x-guirpc-struct; schema=Point').
+    They serialize a record (dict) or a list of records,
+    which are packed back to back after its length.
+    """
+
+    CONTENT_TYPE = "application/x-guirpc-struct"
+    ENCODING = None
+
+    # schema primitive types and their (little-endian) struct codes
+    TYPES = {
+        "bool": "?",
+        "int8": "b",
+        "uint8": "B",
+        "int16": "h",
+        "uint16": "H",
+        "int32": "i",
+        "uint32": "I",
+        "int64": "q",
+        "uint64": "Q",
+        "float32": "f",
+        "float64": "d",
+        "int": "q",
+        "float": "d",
+    }
+
+    _RECORD = 0
+    _RECORDS = 1
+    _HEADER = struct.Struct("<BI")
+
+    FIELDS: Tuple[str, ...] = ()
+    RECORD: struct.Struct = None
+
+    @classmethod
+    def create(
+        cls, name: str, schema: Sequence[Tuple[str, str]]
+    ) -> Type["StructSerializer"]:
+        """
+        Creates the serializer of a record schema and registers it.
+
+        :param name: the serializer registered name.
+        :param schema: the record fields as (name, type) pairs,
+            the types are keys of TYPES or struct format codes
+            (e.g. '16s' for a fixed-length bytes field).
+        """
+        fields = tuple(field for field, _ in schema)
+        codes = "".join(cls.TYPES.get(type_, type_) for _, type_ in schema)
+        serializer = type(
+            name,
+            (cls,),
+            dict(
+                CONTENT_TYPE=f"{cls.CONTENT_TYPE}; schema={name}",
+                FIELDS=fields,
+                RECORD=struct.Struct(f"<{codes}"),
+            ),
+        )
+        return SerializerRegistry.register(serializer, name=name)
+
+    @classmethod
+    def serialize(cls, obj) -> bytes:
+        if isinstance(obj, dict):
+            return cls._HEADER.pack(cls._RECORD, 1) + cls.RECORD.pack(
+                *(obj[field] for field in cls.FIELDS)
+            )
+
+        records = list(obj)
+        record_size = cls.RECORD.size
+        buffer = bytearray(cls._HEADER.size + len(records) * record_size)
+        cls._HEADER.pack_into(buffer, 0, cls._RECORDS, len(records))
+        offset = cls._HEADER.size
+        for record in records:
+            cls.RECORD.pack_into(
+                buffer, offset, *(record[field] for field in cls.FIELDS)
+            )
+            offset += record_size
+        return bytes(buffer)
+
+    @classmethod
+    def deserialize(cls, obj_bytes: bytes, headers: dict = None):
+        kind, _count = cls._HEADER.unpack_from(obj_bytes)
+        header_size = cls._HEADER.size
+        values = memoryview(obj_bytes)[header_size:]
+        records = [
+            dict(zip(cls.FIELDS, record))
+            for record in cls.RECORD.iter_unpack(values)
+        ]
+        return records[0] if kind == cls._RECORD else records
+
+
+class BufferSerializer(BaseBinarySerializer):
+    """
+    This is a zero-copy serializer for contiguous buffers
+    (NumPy arrays, array.array, memoryview or any other object that
+    supports the buffer protocol).
+
+    The raw buffer is the message body and its format and shape are
+    sent in the Buffer-Format and Buffer-Shape headers. On receive,
+    a NumPy array (or a memoryview if NumPy is not installed) is built
+    over the message body without copying it, so it is read-only.
+    """
+
+    CONTENT_TYPE = "application/x-guirpc-buffer"
+    ENCODING = None
+
+    FORMAT_HEADER = "Buffer-Format"
+    SHAPE_HEADER = "Buffer-Shape"
+
+    # NumPy type kinds and sizes to struct codes (used without NumPy)
+    STRUCT_CODES = {
+        "b1": "?",
+        "i1": "b",
+        "u1": "B",
+        "i2": "h",
+        "u2": "H",
+        "i4": "i",
+        "u4": "I",
+        "i8": "q",
+        "u8": "Q",
+        "f4": "f",
+        "f8": "d",
+    }
+
+    @classmethod
+    def serialize(cls, obj) -> memoryview:
+        return cls._buffer(obj).cast("B")
+
+    @classmethod
+    def headers(cls, obj) -> dict:
+        view = memoryview(obj)
+        format_ = view.format
+        if numpy is not None and isinstance(obj, numpy.ndarray):
+            format_ = obj.dtype.str
+        return {
+            cls.FORMAT_HEADER: format_,
+            cls.SHAPE_HEADER: list(view.shape),
+        }
+
+    @classmethod
+    def deserialize(cls, obj_bytes: bytes, headers: dict = None):
+        format_ = headers[cls.FORMAT_HEADER]
+        shape = tuple(headers[cls.SHAPE_HEADER])
+        if numpy is not None:
+            return numpy.frombuffer(obj_bytes, dtype=format_).reshape(shape)
+        return memoryview(obj_bytes).cast(cls._struct_code(format_), shape)
+
+    @classmethod
+    def _buffer(cls, obj) -> memoryview:
+        if numpy is not None and isinstance(obj, numpy.ndarray):
+            obj = numpy.ascontiguousarray(obj)
+        view = memoryview(obj)
+        if not view.c_contiguous:
+            view = memoryview(view.tobytes()).cast(view.format, view.shape)
+        return view
+
+    @classmethod
+    def _struct_code(cls, format_: str) -> str:
+        # NumPy type strings like '<f8' (native byte order is assumed)
+        return cls.STRUCT_CODES.get(format_.lstrip("<>=|"), format_)
+
+
+class PickleBufferSerializer(BaseBinarySerializer):
+    """
+    This is a pickle (protocol 5) serializer that takes large buffers
+    out of band, e.g. NumPy arrays or objects wrapped in
+    pickle.PickleBuffer, so they are not copied into the pickle stream.
+
+    The body is framed in parts: their number and sizes, the pickle
+    stream and then each buffer. On receive the buffers are memoryview
+    slices of the message body, so they are not copied either.
+    Python < 3.8 has no protocol 5, buffers are pickled in band then.
+    """
+
+    CONTENT_TYPE = "application/x-guirpc-pickle"
+    ENCODING = None
+
+    PROTOCOL = min(5, pickle.HIGHEST_PROTOCOL)
+    # smaller buffers are pickled in band
+    OUT_OF_BAND_THRESHOLD = 64 * 1024
+
+    _COUNT = struct.Struct("<I")
+    _SIZE = struct.Struct("<Q")
+
+    @classmethod
+    def serialize(cls, obj) -> bytearray:
+        buffers = []
+
+        def buffer_callback(buffer) -> bool:
+            try:
+                raw = buffer.raw()
+            except BufferError:
+                # non-contiguous buffers are pickled in band
+                return True
+            if raw.nbytes < cls.OUT_OF_BAND_THRESHOLD:
+                return True
+            buffers.append(raw)
+            return False
+
+        options = dict()
+        if cls.PROTOCOL >= 5:
+            options["buffer_callback"] = buffer_callback
+        parts = [memoryview(pickle.dumps(obj, cls.PROTOCOL, **options))]
+        parts.extend(buffers)
+
+        offset = cls._COUNT.size + len(parts) * cls._SIZE.size
+        body = bytearray(offset + sum(part.nbytes for part in parts))
+        cls._COUNT.pack_into(body, 0, len(parts))
+        for index, part in enumerate(parts):
+            cls._SIZE.pack_into(
+                body, cls._COUNT.size + index * cls._SIZE.size, part.nbytes
+            )
+            end = offset + part.nbytes
+            body[offset:end] = part
+            offset = end
+        return body
+
+    @classmethod
+    def deserialize(cls, obj_bytes: bytes, headers: dict = None):
+        view = memoryview(obj_bytes)
+        (count,) = cls._COUNT.unpack_from(view)
+        offset = cls._COUNT.size + count * cls._SIZE.size
+        parts = []
+        for index in range(count):
+            (size,) = cls._SIZE.unpack_from(
+                view, cls._COUNT.size + index * cls._SIZE.size
+            )
+            end = offset + size
+            parts.append(view[offset:end])
+            offset = end
+
+        if count == 1:
+            return pickle.loads(parts[0])
+        return pickle.loads(parts[0], buffers=parts[1:])
+
+
+class StreamSerializer(BaseBinarySerializer):
+    """
+    This is a pass-through serializer for binary streams.
+
+    Requests can be bytes-like or binary file objects, the latter are
+    read chunk by chunk when the producer sends them in chunks
+    (see faas_producer chunk_size). On receive, the object is always
+    a binary file object, so a chunked body is handed to the FaaS
+    as it was reassembled, without reading it into memory.
+    """
+
+    CONTENT_TYPE = "application/octet-stream"
+    ENCODING = None
+
+    @classmethod
+    def serialize(cls, obj):
+        if hasattr(obj, "read"):
+            return obj
+        return memoryview(obj).cast("B")
+
+    @classmethod
+    def deserialize(cls, obj_bytes, headers: dict = None):
+        if hasattr(obj_bytes, "read"):
+            return obj_bytes
+        return io.BytesIO(obj_bytes)
+
+
+class SerializerRegistry:
+    """
+    This is the registry of serializer types,
+    they are looked up by name (e.g. the name sent in the
+    Response-Serializer header) or by content type.
+
+    Built-in serializers are registered by default, applications can
+    register their own ones (a FaaS serializer is also registered
+    when it is used by register_faas).
+    """
+
+    _by_name: Dict[str, Type[BaseSerializer]] = dict()
+    _by_content_type: Dict[str, Type[BaseSerializer]] = dict()
+    _names: Dict[Type[BaseSerializer], str] = dict()
+
+    @classmethod
+    def register(cls, serializer: Type[BaseSerializer] = None, name=None):
+        """
+        Registers a serializer type, it can also be used as
+        a class decorator (with or without a name).
+
+        :param name: the registered name, defaults to the class name.
+        """
+        if serializer is None:
+            return lambda sz: cls.register(sz, name=name)
+
+        name = name or serializer.__name__
+        cls._by_name[name] = serializer
+        cls._names[serializer] = name
+        if serializer.CONTENT_TYPE:
+            cls._by_content_type.setdefault(
+                serializer.CONTENT_TYPE, serializer
+            )
+        return serializer
+
+    @classmethod
+    def get(cls, name: str) -> Type[BaseSerializer]:
+        try:
+            return cls._by_name[name]
+        except KeyError:
+            raise SerializerNotRegisteredError(name)
+
+    @classmethod
+    def get_by_content_type(cls, content_type: str) -> Type[BaseSerializer]:
+        try:
+            return cls._by_content_type[content_type]
+        except KeyError:
+            raise SerializerNotRegisteredError(content_type)
+
+    @classmethod
+    def name_of(cls, serializer: Type[BaseSerializer]) -> str:
+        """The registered name of a serializer, it registers it if needed."""
+        if serializer not in cls._names:
+            cls.register(serializer)
+        return cls._names[serializer]
+
+
+for _serializer in (
+    JsonSerializer,
+    TextSerializer,
+    BinarySerializer,
+    BufferSerializer,
+    PickleBufferSerializer,
+    StreamSerializer,
+):
+    SerializerRegistry.register(_serializer)
@@ -1,7 +1,10 @@
+import asyncio
+import functools
 import hashlib
-import importlib
+import logging
 import os
 from typing import Dict
+from weakref import WeakKeyDictionary
 
 import pika
 from pika.exceptions import (
@@ -10,10 +13,22 @@ from pika.exceptions import (
     AMQPConnectionError,
 )
 
+from .domain.exceptions import SerializerNotRegisteredError
+from .pool import ConnectionPool
 from .providers import ProducerConfiguration
+from .serializers import SerializerRegistry
 
 DEFAULT_CONFIG_ENVAR = "PRODUCER_CONFIG"
 
+LOGGER = logging.getLogger("rpcClient")
+
+
+def running_loop() -> asyncio.AbstractEventLoop:
+    """The event loop running the calling coroutine."""
+    # Python 3.6 has no get_running_loop
+    get_loop = getattr(asyncio, "get_running_loop", asyncio.get_event_loop)
+    return get_loop()
+
 
 def get_producer_config(
     envar: str = DEFAULT_CONFIG_ENVAR,
@@ -33,6 +48,7 @@ def get_producer_config(
 class ClientConnector:
     CONFIG: Dict[str, ProducerConfiguration] = dict()
     BCK_CON: Dict[str, pika.BlockingConnection] = dict()
+    POOL: Dict[str, ConnectionPool] = dict()
 
     initialized_clients = []
 
@@ -41,6 +57,9 @@ class ClientConnector:
     ):
         self._config_envar = config_envar
         self._fail_silently = fail_silently
+        self._client_id = hashlib.md5(
+            self._config_envar.lower().encode()
+        ).hexdigest()
 
         if not self.is_initialized:
             self.reload()
@@ -59,10 +78,19 @@ class ClientConnector:
     def config(self):
         return self._config
 
+    @property
+    def pool(self) -> ConnectionPool:
+        """
+        The pool of connections of the client, each thread checks out
+        its own connection (with its producer) to make requests.
+        The bck_con connection is part of it, and like any other
+        it is closed once it has been idle for too long.
+        """
+        return self._pool
+
     @property
     def client_id(self):
-        md5 = hashlib.md5(self._config_envar.lower().encode())
-        return md5.hexdigest()
+        return self._client_id
 
     @property
     def is_initialized(self):
@@ -70,13 +98,19 @@ class ClientConnector:
 
     @property
     def is_reload_required(self):
-        if not self._bck_con or not self._bck_con.is_open:
-            return True
-        return False
+        # the pool replaces its closed or evicted connections (bck_con
+        # included) on checkout, so it is only reloaded when the client
+        # could not connect or the pool was closed
+        pool = ClientConnector.POOL.get(self.client_id)
+        if pool is not self._pool and pool is not None and not pool.closed:
+            # another connector of the client has reloaded the shared pool
+            self._set_attributes()
+        return not self._bck_con or self._pool.closed
 
     def _set_attributes(self):
         self._bck_con = ClientConnector.BCK_CON[self.client_id]
         self._config = ClientConnector.CONFIG[self.client_id]
+        self._pool = ClientConnector.POOL[self.client_id]
 
     def reload(self):
         config = get_producer_config(self._config_envar)
@@ -92,10 +126,41 @@ class ClientConnector:
 
         ClientConnector.BCK_CON.update({self.client_id: bck_con})
 
+        old_pool = ClientConnector.POOL.get(self.client_id)
+        if old_pool:
+            old_pool.close()
+        pool = self.create_pool(config)
+        if bck_con:
+            pool.add(bck_con)
+            pool.prewarm()
+        ClientConnector.POOL.update({self.client_id: pool})
+
         self._set_attributes()
 
+    @classmethod
+    def create_pool(cls, config: ProducerConfiguration) -> ConnectionPool:
+        # imported here as the producer module depends on this one
+        from .producer import Producer
+
+        def producer_factory(bck_con):
+            return Producer(
+                bck_con,
+                config.amqp_entities,
+                direct_reply_to=config.options.direct_reply_to,
+            )
+
+        return ConnectionPool(
+            functools.partial(cls.open_bck_con, config.con_params.amqp_url),
+            producer_factory,
+            max_size=config.options.pool_size,
+            min_size=config.options.pool_prewarm,
+            idle_timeout=config.options.pool_idle_timeout,
+        )
+
     @classmethod
     def close_all_connections(cls):
+        for pool in cls.POOL.values():
+            pool.close()
         for id_, con in cls.BCK_CON.items():
             try:
                 if con.is_open:
@@ -109,17 +174,102 @@ class ClientConnector:
 
         cls.BCK_CON = dict()
         cls.CONFIG = dict()
+        cls.POOL = dict()
 
     @staticmethod
     def open_bck_con(amqp_url: str):
         return pika.BlockingConnection(pika.URLParameters(amqp_url))
 
 
+class AsyncClientConnector:
+    """
+    This is the asyncio sibling of ClientConnector.
+
+    It keeps one AsyncProducer (and so one connection) per event loop,
+    opened on first use and again whenever it gets closed, which is
+    shared by every concurrent request made from that loop.
+    The producers of the loops that have been closed are released
+    on the next call.
+    """
+
+    def __init__(self, config_envar: str = DEFAULT_CONFIG_ENVAR):
+        self._config_envar = config_envar
+        self._client_id = hashlib.md5(
+            self._config_envar.lower().encode()
+        ).hexdigest()
+        self._config = get_producer_config(config_envar)
+        self._producers: Dict[
+            asyncio.AbstractEventLoop, asyncio.Task
+        ] = WeakKeyDictionary()
+
+    @property
+    def config(self):
+        return self._config
+
+    @property
+    def client_id(self):
+        return self._client_id
+
+    async def get_producer(self):
+        """
+        :rtype: guirpc.amqp.async_producer.AsyncProducer
+        """
+        loop = running_loop()
+        self._release_closed_loops()
+        opening = self._producers.get(loop)
+        if opening is None or self._is_reload_required(opening):
+            # concurrent callers await the same opening task
+            opening = loop.create_task(self._open_producer())
+            self._producers[loop] = opening
+        return await asyncio.shield(opening)
+
+    async def _open_producer(self):
+        # imported here as the producer modules depend on this one
+        from .async_producer import AsyncProducer
+
+        producer = AsyncProducer(
+            self.config.con_params.amqp_url,
+            self.config.amqp_entities,
+            direct_reply_to=self.config.options.direct_reply_to,
+        )
+        await producer.open()
+        return producer
+
+    @staticmethod
+    def _is_reload_required(opening: asyncio.Task):
+        if not opening.done():
+            return False
+        if opening.cancelled() or opening.exception() is not None:
+            return True
+        return not opening.result().is_open
+
+    def _release_closed_loops(self):
+        # a task references its loop, so the entries of closed loops
+        # are not dropped by the WeakKeyDictionary on their own
+        for loop in [loop for loop in self._producers if loop.is_closed()]:
+            self._close_producer(self._producers.pop(loop))
+
+    def _close_producer(self, opening: asyncio.Task):
+        if not opening.done() or self._is_reload_required(opening):
+            return
+        try:
+            opening.result().close()
+        except Exception as err:
+            # e.g. its event loop is closed
+            LOGGER.debug("Producer connection close failed: %s", err)
+
+    def close(self):
+        """Closes the producer connection of every event loop."""
+        producers, self._producers = self._producers, WeakKeyDictionary()
+        for opening in producers.values():
+            self._close_producer(opening)
+
+
 def import_serializer(class_name):
-    module = importlib.import_module("guirpc.amqp.serializers")
+    """Gets a serializer type from the SerializerRegistry by name."""
     try:
-        class_ = getattr(module, class_name)
-    except AttributeError as err:
+        class_ = SerializerRegistry.get(class_name)
+    except SerializerNotRegisteredError as err:
         raise Exception(
             f'An error occurred in "import_serializer":\n'
             f"*** {err.__class__.__name__} ***\n{err}"
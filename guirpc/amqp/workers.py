@@ -0,0 +1,212 @@
+import logging
+import os
+import time
+from concurrent.futures import (
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from concurrent.futures.process import BrokenProcessPool
+from threading import BoundedSemaphore, Lock
+from typing import Callable, Dict
+
+from .chunks import is_stream
+from .domain.contracts import WorkerPoolInterface
+from .domain.objects import ProxyResponse, WorkerPoolStats
+
+LOGGER = logging.getLogger("rpcServer")
+
+# FaaS callables loaded within a ProcessFaaSPool child process
+_PROCESS_FAAS: Dict[str, Callable] = None
+
+
+class WorkerPool(WorkerPoolInterface):
+    """
+    This is a bounded worker pool on top of any concurrent.futures Executor.
+
+    Its size is fixed by max_workers: a call to submit blocks until
+    a worker slot is free, so the caller (the consumer IO loop) stops
+    taking deliveries instead of piling them up in memory.
+    It also keeps track of how busy the workers are (see stats).
+    """
+
+    def __init__(self, executor: Executor, max_workers: int = 4):
+        super().__init__(max_workers)
+        self._executor = executor
+        self._slots = BoundedSemaphore(max_workers)
+        self._lock = Lock()
+        self._started_at = time.monotonic()
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._busy_time = 0.0
+
+    @property
+    def stats(self) -> WorkerPoolStats:
+        with self._lock:
+            return WorkerPoolStats(
+                max_workers=self.max_workers,
+                active=self._active,
+                submitted=self._submitted,
+                completed=self._completed,
+                failed=self._failed,
+                busy_time=self._busy_time,
+                uptime=time.monotonic() - self._started_at,
+            )
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        self._slots.acquire()
+        with self._lock:
+            self._submitted += 1
+        try:
+            return self._executor.submit(self._run, fn, *args, **kwargs)
+        except Exception:
+            with self._lock:
+                self._submitted -= 1
+            self._slots.release()
+            raise
+
+    def _run(self, fn: Callable, *args, **kwargs):
+        started_at = time.monotonic()
+        with self._lock:
+            self._active += 1
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._completed += 1
+                self._failed += int(failed)
+                self._busy_time += time.monotonic() - started_at
+            self._slots.release()
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+class ThreadWorkerPool(WorkerPool):
+    """
+    This is the default worker pool,
+    it runs each task on a reused thread.
+    """
+
+    def __init__(self, max_workers: int = 4):
+        super().__init__(
+            ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="rpcWorker"
+            ),
+            max_workers=max_workers,
+        )
+
+
+class ProcessFaaSPool:
+    """
+    This is a pool of child processes that runs FaaS registered
+    with execution='process'.
+
+    Registered FaaS are closures that can not be pickled, so each child
+    loads them once calling faas_loader (a picklable callable that
+    returns the registered FaaS by name). Then only the request body
+    and properties are sent to the child, and the encoded response
+    bytes and properties come back.
+
+    If a child dies abruptly (e.g. killed by the OOM killer), the requests
+    it was running fail and the pool is replaced with a new one.
+    """
+
+    def __init__(
+        self,
+        faas_loader: Callable[[], Dict[str, Callable]],
+        max_workers: int = 0,
+    ):
+        self._faas_loader = faas_loader
+        self._max_workers = max_workers or os.cpu_count() or 1
+        self._lock = Lock()
+        self._executor = ProcessPoolExecutor(max_workers=self._max_workers)
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    def submit(self, faas_name: str, body: bytes, properties) -> Future:
+        """
+        :return: a future whose result must be passed to to_response.
+        """
+        if is_stream(body):
+            # a reassembled chunked body cannot be sent to the process
+            body = body.read()
+        args = (self._faas_loader, faas_name, body, properties)
+        executor = self._executor
+        try:
+            future = executor.submit(_call_process_faas, *args)
+        except BrokenProcessPool:
+            executor = self._replace_broken(executor)
+            future = executor.submit(_call_process_faas, *args)
+        future.add_done_callback(
+            lambda done: self._on_call_done(done, executor)
+        )
+        return future
+
+    def _on_call_done(self, future: Future, executor: ProcessPoolExecutor):
+        if not future.cancelled() and isinstance(
+            future.exception(), BrokenProcessPool
+        ):
+            self._replace_broken(executor)
+
+    def _replace_broken(
+        self, executor: ProcessPoolExecutor
+    ) -> ProcessPoolExecutor:
+        """Replaces the executor if it is still the broken one."""
+        with self._lock:
+            if self._executor is executor:
+                LOGGER.error(
+                    "A child process of the process pool terminated "
+                    "abruptly, starting a new process pool"
+                )
+                executor.shutdown(wait=False)
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self._max_workers
+                )
+            return self._executor
+
+    def call(self, faas_name: str, body: bytes, properties) -> ProxyResponse:
+        return self.to_response(
+            self.submit(faas_name, body, properties).result()
+        )
+
+    @staticmethod
+    def to_response(result: tuple) -> ProxyResponse:
+        status, error_message, bytes_, encoding, ctype, headers = result
+        x_resp = ProxyResponse(status, error_message=error_message)
+        x_resp.set_properties(
+            bytes_=bytes_,
+            encoding=encoding,
+            content_type=ctype,
+            message_headers=headers,
+        )
+        return x_resp
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait)
+
+
+def _call_process_faas(faas_loader, faas_name, body, properties) -> tuple:
+    global _PROCESS_FAAS
+    if _PROCESS_FAAS is None:
+        _PROCESS_FAAS = faas_loader()
+
+    x_resp = _PROCESS_FAAS[faas_name](body, properties)
+    return (
+        x_resp.status_code,
+        x_resp.error_message,
+        x_resp.bytes,
+        x_resp.encoding,
+        x_resp.content_type,
+        x_resp.message_headers,
+    )
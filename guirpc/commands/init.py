@@ -33,6 +33,11 @@ routing_key = {routing_key}
 [server.options]
 max_workers = {max_workers}
 prefetch_count = {prefetch_count}
+ack_mode = {ack_mode}
+engine = {engine}
+concurrency = {concurrency}
+process_workers = {process_workers}
+channels = {channels}
 """
 
 PRODUCER_INI = """
@@ -54,6 +59,10 @@ routing_key = {routing_key}
 
 [client.options]
 response_consumer = {consumer}
+pool_size = {pool_size}
+pool_prewarm = {pool_prewarm}
+pool_idle_timeout = {pool_idle_timeout}
+binary_codec = {binary_codec}
 """
 
 
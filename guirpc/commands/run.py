@@ -1,16 +1,24 @@
+import functools
 import logging
 import logging.config
 import os
+import signal
+import threading
+import time
 from importlib import util
 
 import yaml
 
+from guirpc.amqp.async_consumer import AsyncProxyReconnectConsumer
 from guirpc.amqp.consumer import ProxyReconnectConsumer
 from guirpc.amqp.domain.exceptions import (
     AMQPConnectionURINotSetError,
     ConsumerConfigurationError,
+    InvalidServerOptionError,
 )
+from guirpc.amqp.domain.objects import ServerOptions
 from guirpc.amqp.providers import ConsumerConfiguration
+from guirpc.commands.supervisor import ConsumerSupervisor
 
 RESOURCES_DIR = os.path.join(
     os.path.dirname(os.path.dirname(__file__)), "resources"
@@ -44,6 +52,12 @@ def _import_faas_module(app_file):
     spec.loader.exec_module(FaaS_MODULE)
 
 
+def load_registered_faas(app_file):
+    """Loads the registered FaaS, it is used by process worker pools."""
+    registered_faas, _ = find_registered_faas(app_file)
+    return registered_faas
+
+
 def find_registered_faas(app_file):
     err = _import_faas_module(app_file)
 
@@ -76,7 +90,7 @@ class ConfigININotProvidedError(Exception):
         )
 
 
-def runconsumer(with_config, **options):
+def runconsumer(with_config, processes: int = 1, **options):
     _configure_logging()
     logger = logging.getLogger("rpcServer")
 
@@ -84,32 +98,120 @@ def runconsumer(with_config, **options):
     if not config_filepath:
         raise ConfigININotProvidedError
 
+    cs_conf = _read_consumer_config(config_filepath)
+    if processes > 1:
+        logger.info("*" * 16 + f" {cs_conf.verbose_name} " + "*" * 16)
+        logger.info("Supervising %d consumer processes" % processes)
+        supervisor = ConsumerSupervisor(
+            _run_consumer_process, args=(config_filepath,), processes=processes
+        )
+        supervisor.run()
+        return
+
+    consumer = _load_consumer(cs_conf, logger)
+    if consumer:
+        consumer.run()
+
+
+def _read_consumer_config(config_filepath) -> ConsumerConfiguration:
     try:
         cs_conf = ConsumerConfiguration.get_instance(config_filepath)
-    except AMQPConnectionURINotSetError as err:
+    except (AMQPConnectionURINotSetError, InvalidServerOptionError) as err:
         raise err
     except Exception:
         raise ConsumerConfigurationError
 
+    return cs_conf
+
+
+def _load_consumer(cs_conf: ConsumerConfiguration, logger):
     callables, err = find_registered_faas(cs_conf.root)
-    if not err:
-        consumer = ProxyReconnectConsumer(
-            faas_callables=callables,
-            amqp_url=cs_conf.con_params.amqp_url,
-            amqp_entities=cs_conf.amqp_entities,
-            **cs_conf.options.as_dict,
+    if err:
+        logger.info(
+            f"An error occurred while loading consumer application: {err}"
+        )
+        return None
+
+    consumer = _create_consumer(cs_conf, callables)
+
+    logger.info("*" * 16 + f" {cs_conf.verbose_name} " + "*" * 16)
+    for name in callables.keys():
+        logger.info("#" * 3 + " registered FaaS: %s" % name)
+
+    logger.info(
+        "Options (throughput): max_workers=%s; prefetch_count=%s; "
+        "ack_mode=%s; channels=%s;"
+        % (
+            consumer.max_workers,
+            consumer.prefetch_count,
+            consumer.ack_mode,
+            consumer.channels,
+        )
+    )
+    if cs_conf.options.engine == ServerOptions.ENGINE_ASYNCIO:
+        logger.info(
+            "Options (asyncio): concurrency=%s;" % consumer.concurrency
+        )
+    if consumer.process_pool:
+        logger.info(
+            "Options (process): process_workers=%s;"
+            % consumer.process_pool.max_workers
         )
 
-        logger.info("*" * 16 + f" {cs_conf.verbose_name} " + "*" * 16)
-        for name in callables.keys():
-            logger.info("#" * 3 + " registered FaaS: %s" % name)
+    return consumer
 
-        logger.info(
-            "Options (throughput): max_workers=%s; prefetch_count=%s;"
-            % (consumer.max_workers, consumer.prefetch_count)
+
+def _run_consumer_process(config_filepath, replies_counter):
+    """Target of the consumer processes run by the ConsumerSupervisor."""
+    signal.signal(signal.SIGTERM, _interrupt_consumer)
+    signal.signal(signal.SIGINT, _interrupt_consumer)
+    _configure_logging()
+    logger = logging.getLogger("rpcServer")
+
+    consumer = _load_consumer(_read_consumer_config(config_filepath), logger)
+    if consumer:
+        reporter = threading.Thread(
+            target=_report_replies,
+            args=(consumer, replies_counter),
+            daemon=True,
         )
+        reporter.start()
         consumer.run()
-    else:
-        logger.info(
-            f"An error occurred while loading consumer application: {err}"
+
+
+def _interrupt_consumer(_signum, _frame):
+    # the consumer stops on KeyboardInterrupt, further signals
+    # are ignored so that it can drain gracefully
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise KeyboardInterrupt
+
+
+def _report_replies(consumer, replies_counter, interval=1.0):
+    while True:
+        replies_counter.value = consumer.replies_published
+        time.sleep(interval)
+
+
+def _create_consumer(cs_conf: ConsumerConfiguration, callables: dict):
+    options = cs_conf.options.as_dict
+    options["faas_loader"] = functools.partial(
+        load_registered_faas, cs_conf.root
+    )
+    engine = options.pop("engine")
+    concurrency = options.pop("concurrency")
+    if engine == ServerOptions.ENGINE_ASYNCIO:
+        return AsyncProxyReconnectConsumer(
+            faas_callables=callables,
+            amqp_url=cs_conf.con_params.amqp_url,
+            amqp_entities=cs_conf.amqp_entities,
+            concurrency=concurrency,
+            **options,
         )
+
+    return ProxyReconnectConsumer(
+        faas_callables=callables,
+        amqp_url=cs_conf.con_params.amqp_url,
+        amqp_entities=cs_conf.amqp_entities,
+        **options,
+    )
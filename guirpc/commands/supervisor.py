@@ -0,0 +1,176 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from typing import Callable
+
+LOGGER = logging.getLogger("rpcServer")
+
+
+class ConsumerSupervisor:
+    """
+    This is a prefork supervisor that runs N consumer processes.
+
+    Each child process runs target(*args, replies_counter), where
+    replies_counter is a shared integer that the child keeps updated with
+    the number of replies it has published, so that the supervisor can
+    log the throughput of every child and the total.
+
+    Children that die unexpectedly are restarted with an exponential
+    backoff, and SIGTERM/SIGINT are forwarded to them as SIGTERM
+    so that they stop consuming and drain gracefully.
+    """
+
+    MAX_RESTART_DELAY = 300
+    STABLE_UPTIME = 60
+    STATS_INTERVAL = 30
+    STOP_TIMEOUT = 30
+
+    def __init__(self, target: Callable, args: tuple = (), processes: int = 2):
+        self._target = target
+        self._args = args
+        self._processes = processes
+        self._stopping = False
+        self._slots = [_ChildSlot(index) for index in range(processes)]
+
+    @property
+    def processes(self):
+        return self._processes
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_stop_signal)
+        signal.signal(signal.SIGINT, self._on_stop_signal)
+
+        for slot in self._slots:
+            self._start_child(slot)
+
+        last_stats = time.monotonic()
+        while not self._stopping:
+            time.sleep(0.5)
+            for slot in self._slots:
+                self._check_child(slot)
+            if time.monotonic() - last_stats >= self.STATS_INTERVAL:
+                self._log_stats(time.monotonic() - last_stats)
+                last_stats = time.monotonic()
+
+        self._stop_children()
+
+    def _on_stop_signal(self, signum, _frame):
+        if not self._stopping:
+            LOGGER.info(
+                "Supervisor received signal %d, stopping consumers", signum
+            )
+            self._stopping = True
+
+    def _start_child(self, slot):
+        slot.process = multiprocessing.Process(
+            target=self._target,
+            args=(*self._args, slot.counter),
+            name=f"guirpc-consumer-{slot.index}",
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        slot.restart_at = None
+        LOGGER.info(
+            "Started consumer process #%d (pid=%d)",
+            slot.index,
+            slot.process.pid,
+        )
+
+    def _check_child(self, slot):
+        if slot.restart_at is not None:
+            if time.monotonic() >= slot.restart_at:
+                self._start_child(slot)
+            return
+        if slot.process.is_alive():
+            return
+
+        slot.collect_replies()
+        uptime = time.monotonic() - slot.started_at
+        if uptime >= self.STABLE_UPTIME:
+            slot.restart_delay = 0
+        slot.restart_delay = min(
+            max(1, slot.restart_delay * 2), self.MAX_RESTART_DELAY
+        )
+        slot.restart_at = time.monotonic() + slot.restart_delay
+        LOGGER.warning(
+            "Consumer process #%d (pid=%d) exited with code %s, "
+            "restarting it in %d seconds",
+            slot.index,
+            slot.process.pid,
+            slot.process.exitcode,
+            slot.restart_delay,
+        )
+
+    def _log_stats(self, elapsed):
+        total_rate = 0.0
+        for slot in self._slots:
+            rate = slot.pop_replies() / elapsed
+            total_rate += rate
+            LOGGER.info(
+                "Consumer process #%d: %.2f replies/s (%d in total)",
+                slot.index,
+                rate,
+                slot.replies,
+            )
+        LOGGER.info(
+            "Consumer processes (%d): %.2f replies/s",
+            self.processes,
+            total_rate,
+        )
+
+    def _stop_children(self):
+        alive = [
+            slot.process
+            for slot in self._slots
+            if slot.process and slot.process.is_alive()
+        ]
+        for process in alive:
+            process.terminate()
+
+        deadline = time.monotonic() + self.STOP_TIMEOUT
+        for process in alive:
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                LOGGER.warning(
+                    "Consumer process %s did not drain in time, killing it",
+                    process.name,
+                )
+                os.kill(process.pid, signal.SIGKILL)
+                process.join()
+
+        for slot in self._slots:
+            slot.pop_replies()
+        LOGGER.info(
+            "Supervisor stopped; replies published: %d",
+            sum(slot.replies for slot in self._slots),
+        )
+
+
+class _ChildSlot:
+    def __init__(self, index):
+        self.index = index
+        self.counter = multiprocessing.Value("Q", 0)
+        self.process = None
+        self.started_at = None
+        self.restart_at = None
+        self.restart_delay = 0
+        self.replies = 0
+        self._reported = 0
+        self._carried = 0
+
+    def pop_replies(self) -> int:
+        """Replies published since the last call."""
+        current = self.counter.value
+        delta = self._carried + current - self._reported
+        self._carried = 0
+        self._reported = current
+        self.replies += delta
+        return delta
+
+    def collect_replies(self):
+        # the counter is reset, as the next child counts from zero
+        self._carried += self.counter.value - self._reported
+        self.counter.value = 0
+        self._reported = 0
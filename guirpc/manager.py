@@ -2,6 +2,8 @@ import os
 
 import click
 
+from guirpc.amqp.domain.encoding import BytesEncoder
+from guirpc.amqp.domain.objects import ClientOptions, ServerOptions
 from guirpc.commands.init import initconsumer, initproducer, createconfig
 from guirpc.commands.run import runconsumer
 
@@ -29,6 +31,14 @@ cli_manager = click.CommandCollection(
     help="the .ini configuration file path to run the consumer. "
     "Default value gets CONSUMER_CONFIG environment variable.",
 )
+@click.option(
+    "-n",
+    "--processes",
+    type=int,
+    help="Number of consumer processes to prefork and supervise. "
+    "Crashed processes are restarted.",
+    default=1,
+)
 def run_consumer(with_config, **options):
     """Run an RPC server/consumer."""
     runconsumer(with_config, **options)
@@ -61,6 +71,47 @@ def run_consumer(with_config, **options):
     "(each worker can handle 1 message at a time)",
     default=4,
 )
+@click.option(
+    "-a",
+    "--ack-mode",
+    type=click.Choice(ServerOptions.ACK_MODES),
+    help="when messages are acknowledged: on receipt (early), "
+    "after the reply (late) or after the reply "
+    "with combined multiple acks (late_batched).",
+    default=ServerOptions.ACK_EARLY,
+)
+@click.option(
+    "-e",
+    "--engine",
+    type=click.Choice(ServerOptions.ENGINES),
+    help="the consumer engine: worker threads (thread) "
+    "or an asyncio event loop (asyncio).",
+    default=ServerOptions.ENGINE_THREAD,
+)
+@click.option(
+    "-n",
+    "--concurrency",
+    type=int,
+    help="Maximum number of messages processed at the same time "
+    "by the asyncio engine.",
+    default=100,
+)
+@click.option(
+    "-P",
+    "--process-workers",
+    type=int,
+    help="Number of worker processes for the FaaS registered "
+    "with execution='process' (0 uses the number of CPUs).",
+    default=0,
+)
+@click.option(
+    "-C",
+    "--channels",
+    type=int,
+    help="Number of consuming channels opened on the connection "
+    "(each one with its own prefetch count).",
+    default=1,
+)
 @click.option(
     "-U",
     "--connect",
@@ -83,7 +134,44 @@ def init_consumer(app_name, **options):
 @click.option(
     "-r", "--routing-key", help="the routing key.", default="my_queue"
 )
-@click.option("-C", "--consumer", help="the response consumer.", default="")
+@click.option(
+    "-C",
+    "--consumer",
+    help="the response consumer, "
+    f'use "{ClientOptions.DIRECT_REPLY_TO}" for direct reply-to.',
+    default="",
+)
+@click.option(
+    "-s",
+    "--pool-size",
+    type=int,
+    help="Maximum number of pooled connections, "
+    "so that concurrent threads do not share a connection.",
+    default=4,
+)
+@click.option(
+    "-w",
+    "--pool-prewarm",
+    type=int,
+    help="Number of pooled connections opened beforehand "
+    "and kept open while idle.",
+    default=1,
+)
+@click.option(
+    "-i",
+    "--pool-idle-timeout",
+    type=float,
+    help="Seconds after which an idle pooled connection is closed.",
+    default=300,
+)
+@click.option(
+    "-b",
+    "--binary-codec",
+    type=click.Choice(BytesEncoder.BINARY_CODECS),
+    help="the binary codec of the messages: base64 "
+    "or raw (smaller and faster, it needs an up to date consumer).",
+    default=BytesEncoder.BINARY_CODECS[0],
+)
 @click.option(
     "-U",
     "--connect",